@@ -8,4 +8,24 @@ __license__ = "MIT"
 __email__ = "pyslvs@gmail.com"
 __version__ = "2.1.1"
 
-from .loader import gen_api
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .loader import gen_api, render_index  # noqa: F401
+    from .shard import gen_shard, merge_shards  # noqa: F401
+
+_MODULES = {
+    'gen_api': 'loader',
+    'render_index': 'loader',
+    'gen_shard': 'shard',
+    'merge_shards': 'shard',
+}
+__all__ = ['gen_api', 'render_index', 'gen_shard', 'merge_shards']
+
+
+def __getattr__(name: str) -> Any:
+    """Import the compiler functions on first use."""
+    if name in _MODULES:
+        from importlib import import_module
+        return getattr(import_module(f'.{_MODULES[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,12 +7,31 @@ __copyright__ = "Copyright (C) 2020-2021"
 __license__ = "MIT"
 __email__ = "pyslvs@gmail.com"
 
-from argparse import ArgumentParser
+from collections.abc import Callable
+from argparse import ArgumentParser, Namespace
 
 
-def main() -> None:
-    """Main function."""
+# The options which can not be used with the modes
+_CONFLICTS = {
+    'from_index': ('merge', 'shard', 'serve', 'watch', 'cache', 'index',
+                   'profile', 'profile_out'),
+    'merge': ('shard', 'serve', 'watch', 'cache', 'profile', 'profile_out'),
+    'shard': ('serve', 'watch', 'dry', 'stream', 'split', 'search', 'index',
+              'profile', 'profile_out', 'warnings_out', 'max_warnings'),
+    'serve': ('watch', 'dry', 'stream', 'split', 'search', 'index',
+              'profile', 'profile_out', 'warnings_out', 'max_warnings'),
+    'watch': ('dry', 'stream', 'index', 'profile', 'profile_out',
+              'warnings_out', 'max_warnings'),
+}
+
+
+def _parser() -> ArgumentParser:
+    """The parser of the command line arguments."""
+    from logging import DEBUG, INFO, WARNING
     from apimd import __version__
+    from apimd.defaults import (
+        CACHE_DIR, CACHE_SIZE, EXT_TIMEOUT, SOURCES, SOURCE, PORT,
+    )
     ver = f"apimd {__version__}"
     parser = ArgumentParser(
         prog=ver,
@@ -20,10 +39,17 @@ def main() -> None:
         epilog=f"{__copyright__} {__license__} {__author__} {__email__}"
     )
     parser.add_argument('-v', '--version', action='version', version=ver)
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-q', '--quiet', dest='log_level',
+                           action='store_const', const=WARNING,
+                           default=INFO, help="only show the warnings")
+    verbosity.add_argument('--verbose', dest='log_level',
+                           action='store_const', const=DEBUG,
+                           help="show the loaded files and the cache usage")
     parser.add_argument(
         'module',
         default=None,
-        nargs='+',
+        nargs='*',
         type=str,
         help="the module name in the current path, use the syntax "
              "`Module-Name=module_name` to specify a name for it"
@@ -36,24 +62,198 @@ def main() -> None:
                             type=str, help=h)
     parser.add_argument('--level', metavar="LEVEL", default=1, nargs='?',
                         type=int, help="the starting level of the sections")
+    parser.add_argument('-j', '--jobs', metavar="N", default=1, type=int,
+                        help="parse modules in N processes, "
+                             "0 means using all processors")
+    parser.add_argument('--cache', metavar="DIR", default=None, nargs='?',
+                        const=CACHE_DIR, type=str,
+                        help="cache the parsed modules in the directory, "
+                             f"default to \"{CACHE_DIR}\"")
+    parser.add_argument('--cache-size', metavar="MB", default=CACHE_SIZE,
+                        type=lambda s: int(float(s) * 1024 * 1024),
+                        help="the size limit of the cache in MB")
+    parser.add_argument('--source', default=SOURCE, choices=SOURCES,
+                        help="parse the stub or the source if both exist, "
+                             "\"merge\" parses the stub and fills the "
+                             "docstrings from the source, "
+                             f"default to \"{SOURCE}\"")
+    parser.add_argument('--ext-timeout', metavar="SEC", default=EXT_TIMEOUT,
+                        type=float,
+                        help="the time limit of loading an extension module")
     for cmd, h in [
         ('--toc', "generate table of contents"),
         ('--no-link', "don't use link anchor"),
         ('--dry', "show the result instead write the file"),
+        ('--watch', "regenerate the changed modules until interrupted"),
+        ('--serve', "serve the documents on a local server, "
+                    "compile each page when requested"),
+        ('--stream', "write the documents chunk by chunk to save memory"),
+        ('--split', "write each module to its own file"),
+        ('--search', "write the search index of the public names"),
+        ('--profile', "report the time of each phase and module"),
     ]:
         parser.add_argument(cmd, action='store_true', help=h)
-    arg = parser.parse_args()
+    parser.add_argument('--port', metavar="PORT", default=PORT, type=int,
+                        help="the port of the local server")
+    parser.add_argument('--index', metavar="FILE", default=None, type=str,
+                        help="save the parsed modules to a JSON index file, "
+                             "compressed by gzip if the suffix is \".gz\"")
+    parser.add_argument('--from-index', metavar="FILE", default=None,
+                        type=str,
+                        help="generate from the index file instead of "
+                             "parsing the modules, all of them by default")
+    parser.add_argument('--shard', metavar="I/N", default=None, type=str,
+                        help="parse the I-th of N parts of the modules "
+                             "and save them to the --shard-out file")
+    parser.add_argument('--shard-out', metavar="FILE", default=None,
+                        type=str, help="the output file of the shard")
+    parser.add_argument('--merge', metavar="FILE", default=None, nargs='+',
+                        type=str,
+                        help="merge the shard files and generate the "
+                             "documents, the options of the shards are used")
+    parser.add_argument('--warnings-out', metavar="FILE", default=None,
+                        type=str,
+                        help="dump the counted warnings as JSON")
+    parser.add_argument('--max-warnings', metavar="N", default=None,
+                        type=int,
+                        help="exit with an error if there are more than "
+                             "N warnings")
+    parser.add_argument('--profile-out', metavar="FILE", default=None,
+                        type=str,
+                        help="dump the profile as JSON if the suffix is "
+                             "\".json\", otherwise a pstats file")
+    return parser
+
+
+def _is_set(value: object) -> bool:
+    """Return true if the option is given."""
+    return value is not None and value is not False
+
+
+def _root_names(modules: list[str]) -> dict[str, str]:
+    """The titles and the names of the modules."""
     root_names = {}
-    for m in arg.module:  # type: str
+    for m in modules:
         n = m.split('=', maxsplit=1)
         if len(n) == 1:
             n.append(n[0])
         if n[1] == "":
             n[1] = n[0]
         root_names[n[0]] = n[1]
+    return root_names
+
+
+def _from_index(parser: ArgumentParser, arg: Namespace,
+                root_names: dict[str, str]) -> None:
+    """Generate the documents from the index file."""
+    from apimd.loader import render_index
+    render_index(arg.from_index, root_names or None, prefix=arg.dir,
+                 link=not arg.no_link, level=arg.level, toc=arg.toc,
+                 dry=arg.dry, jobs=arg.jobs, stream=arg.stream,
+                 split=arg.split, search=arg.search,
+                 warnings_out=arg.warnings_out,
+                 max_warnings=arg.max_warnings)
+
+
+def _merge(parser: ArgumentParser, arg: Namespace,
+           root_names: dict[str, str]) -> None:
+    """Merge the shard files and generate the documents."""
+    from apimd.shard import merge_shards
+    try:
+        merge_shards(arg.merge, prefix=arg.dir, dry=arg.dry,
+                     jobs=arg.jobs, ext_timeout=arg.ext_timeout,
+                     stream=arg.stream, split=arg.split,
+                     search=arg.search, index=arg.index,
+                     warnings_out=arg.warnings_out,
+                     max_warnings=arg.max_warnings)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def _shard(parser: ArgumentParser, arg: Namespace,
+           root_names: dict[str, str]) -> None:
+    """Parse a part of the modules and save them."""
+    from apimd.shard import parse_shard, gen_shard
+    try:
+        shard = parse_shard(arg.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    gen_shard(root_names, arg.current, shard=shard, out=arg.shard_out,
+              link=not arg.no_link, level=arg.level, toc=arg.toc,
+              jobs=arg.jobs, cache=arg.cache, cache_size=arg.cache_size,
+              source=arg.source)
+
+
+def _serve(parser: ArgumentParser, arg: Namespace,
+           root_names: dict[str, str]) -> None:
+    """Serve the documents on a local server."""
+    from apimd.server import serve
+    serve(root_names, arg.current, port=arg.port, link=not arg.no_link,
+          level=arg.level, toc=arg.toc, jobs=arg.jobs, cache=arg.cache,
+          cache_size=arg.cache_size, ext_timeout=arg.ext_timeout,
+          source=arg.source)
+
+
+def _watch(parser: ArgumentParser, arg: Namespace,
+           root_names: dict[str, str]) -> None:
+    """Regenerate the documents of the changed modules."""
+    from apimd.loader import watch
+    watch(root_names, arg.current, prefix=arg.dir, link=not arg.no_link,
+          level=arg.level, toc=arg.toc, jobs=arg.jobs, cache=arg.cache,
+          cache_size=arg.cache_size, ext_timeout=arg.ext_timeout,
+          source=arg.source, split=arg.split, search=arg.search)
+
+
+def _gen(parser: ArgumentParser, arg: Namespace,
+         root_names: dict[str, str]) -> None:
+    """Generate the documents of the modules."""
     from apimd.loader import gen_api
-    gen_api(root_names, arg.current, prefix=arg.dir, link=not arg.no_link,
-            level=arg.level, toc=arg.toc, dry=arg.dry)
+    gen_api(root_names, arg.current, prefix=arg.dir,
+            link=not arg.no_link, level=arg.level, toc=arg.toc,
+            dry=arg.dry, jobs=arg.jobs, cache=arg.cache,
+            cache_size=arg.cache_size, ext_timeout=arg.ext_timeout,
+            source=arg.source, stream=arg.stream, split=arg.split,
+            search=arg.search, index=arg.index, profile=arg.profile,
+            profile_out=arg.profile_out,
+            warnings_out=arg.warnings_out, max_warnings=arg.max_warnings)
+
+
+_Mode = Callable[[ArgumentParser, Namespace, dict[str, str]], None]
+_MODES: list[tuple[str, _Mode]] = [
+    ('from_index', _from_index),
+    ('merge', _merge),
+    ('shard', _shard),
+    ('serve', _serve),
+    ('watch', _watch),
+]
+
+
+def main() -> None:
+    """Main function."""
+    from apimd.logger import set_level
+    parser = _parser()
+    arg = parser.parse_args()
+    set_level(arg.log_level)
+    if not arg.module and arg.from_index is None and arg.merge is None:
+        parser.error("the following arguments are required: module")
+    if (arg.shard is None) != (arg.shard_out is None):
+        parser.error("--shard and --shard-out should be used together")
+    run = _gen
+    for mode, f in _MODES:
+        if not _is_set(getattr(arg, mode)):
+            continue
+        for opt in _CONFLICTS[mode]:
+            if _is_set(getattr(arg, opt)):
+                parser.error(f"argument --{opt.replace('_', '-')}: "
+                             f"not allowed with argument "
+                             f"--{mode.replace('_', '-')}")
+        run = f
+        break
+    from apimd.diagnostics import WarningLimitError
+    try:
+        run(parser, arg, _root_names(arg.module))
+    except WarningLimitError as e:
+        parser.exit(1, f"{e}\n")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Read the modules from wheels, sdists and zip files without extraction."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from collections.abc import Iterable, Iterator
+from os.path import isfile
+from .logger import logger
+from .parser import parent
+
+ARCHIVE_SUFFIXES = ('.whl', '.zip', '.tar.gz', '.tgz', '.tar')
+PEP561_SUFFIX = '-stubs'
+_EXTS = ('.py', '.pyi')
+_IGNORED = {'test', 'tests', 'doc', 'docs', 'example', 'examples',
+            'benchmark', 'benchmarks', 'build'}
+
+
+def is_archive(path: str) -> bool:
+    """Check the path is an archive file."""
+    return path.endswith(ARCHIVE_SUFFIXES) and isfile(path)
+
+
+def _members(path: str) -> Iterator[tuple[str, bytes]]:
+    """Read the scripts of the archive in the stored order."""
+    from zipfile import ZipFile
+    from tarfile import open as tar_open
+    if path.endswith(('.whl', '.zip')):
+        with ZipFile(path) as z:
+            for info in z.infolist():
+                if not info.is_dir() and info.filename.endswith(_EXTS):
+                    yield info.filename, z.read(info)
+        return
+    with tar_open(path, 'r:*') as t:
+        for m in t:
+            if not m.isfile() or not m.name.endswith(_EXTS):
+                continue
+            f = t.extractfile(m)
+            if f is not None:
+                yield m.name, f.read()
+
+
+def _names(path: str) -> Iterator[str]:
+    """List the member names of the archive without reading them."""
+    from zipfile import ZipFile
+    from tarfile import open as tar_open
+    if path.endswith(('.whl', '.zip')):
+        with ZipFile(path) as z:
+            yield from z.namelist()
+        return
+    with tar_open(path, 'r:*') as t:
+        for m in t:
+            yield m.name
+
+
+def archive_packages(path: str) -> list[str]:
+    """The top-level packages in the archive.
+
+    They are the directories with `__init__.py` or `__init__.pyi`
+    but their parents are not, and the modules in the root of wheels.
+    The stub packages are included as their names without "-stubs",
+    and the tests, documents and examples are ignored.
+    """
+    members = [n for n in _names(path) if n.endswith(_EXTS)]
+    pkg_dirs = {parent(n).removesuffix('/__init__') for n in members
+                if parent(n).endswith('/__init__')
+                or parent(n) == '__init__'}
+    found: list[str] = []
+    for d in sorted(pkg_dirs, key=lambda d: (d.count('/'), d)):
+        if d.rpartition('/')[0] in pkg_dirs:
+            continue
+        name = d.rpartition('/')[2].removesuffix(PEP561_SUFFIX)
+        if name.isidentifier() and name not in _IGNORED | set(found):
+            found.append(name)
+    if path.endswith('.whl'):
+        for n in members:
+            name = parent(n)
+            if '/' not in name and name.isidentifier() and name not in found:
+                found.append(name)
+    return found
+
+
+def _prefix(scripts: Iterable[str], pkg: str) -> Optional[str]:
+    """The shallowest directory which has the package `pkg`,
+    or `None` if not found.
+    """
+    found = []
+    for s in scripts:
+        parts = s.split('/')
+        if pkg in parts:
+            i = parts.index(pkg)
+            found.append((i, '/'.join(parts[:i])))
+    return min(found)[1] if found else None
+
+
+def _order(path: str) -> tuple[tuple[int, str], ...]:
+    """Sorting key of the scripts as `walk_packages`, the scripts of a
+    directory are in front of its subdirectories.
+    """
+    *dirs, stem = path.split('/')
+    return (*((1, d) for d in dirs), (0, stem))
+
+
+def walk_archive(path: str, name: str) -> Iterator[tuple[str, dict[str, str]]]:
+    """Walk the package `name` and its stub package `name-stubs`
+    in the archive, yield the module names and their scripts
+    of the extensions ".py" and ".pyi".
+
+    The modules are in the same order as `walk_packages`.
+    The extension modules can not be loaded from the archive.
+    """
+    scripts: dict[str, dict[str, str]] = {}
+    for member, data in _members(path):
+        parts = member.split('/')
+        stem = parent(parts[-1])
+        if not ({name, name + PEP561_SUFFIX} & {*parts[:-1], stem}):
+            continue
+        scripts.setdefault(parent(member), {})[
+            member.removeprefix(parent(member))] = data.decode('utf-8')
+    for pkg in (name, name + PEP561_SUFFIX):
+        prefix = _prefix(scripts, pkg)
+        if prefix is None:
+            continue
+        head = prefix + '/' if prefix else ''
+        pkg_path = head + pkg
+        found = [s for s in scripts
+                 if s == pkg_path or s.startswith(pkg_path + '/')]
+        for s in sorted(found, key=lambda s: _order(s.removeprefix(head))):
+            module = (s.removeprefix(head)
+                      .replace(PEP561_SUFFIX, "")
+                      .replace('/', '.')
+                      .removesuffix('.__init__'))
+            logger.debug("%s <= %s/%s", module, path, s)
+            yield module, scripts[s]
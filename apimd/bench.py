@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite with synthetic packages.
+
+Usage: python -m apimd.bench --modules 1000 --json result.json
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from collections.abc import Callable
+from argparse import ArgumentParser
+from dataclasses import dataclass, asdict
+from logging import disable, WARNING
+from os import makedirs
+from os.path import isfile, join
+from json import dump
+from sys import stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import start, stop, get_traced_memory
+from ast import expr
+from .defaults import SOURCES, SOURCE
+from .loader import walk_packages, _read, _select
+from .parser import Parser
+
+_TYPES = ('int', 'str', 'float', 'bytes', 'bool')
+_GENERICS = ('List[{}]', 'Optional[{}]', 'Dict[str, {}]', 'Tuple[{}, ...]',
+             'Sequence[{}]', 'Union[{}, None]')
+
+
+def _annotation(depth: int, seed: int) -> str:
+    """Nested annotation with deprecated `typing` names."""
+    ann = _TYPES[seed % len(_TYPES)]
+    for i in range(depth):
+        ann = _GENERICS[(seed + i) % len(_GENERICS)].format(ann)
+    return ann
+
+
+@dataclass
+class Synthetic:
+    """Specification of a synthetic package.
+
+    Each module has `classes` classes with `methods` methods,
+    `functions` functions and `aliases` type aliases,
+    the annotations are nested in `depth` levels.
+    The modules are grouped into subpackages of `group` modules,
+    and the first class of each module is re-exported by the root package.
+    A part of modules (`stubs` ratio) have stub files.
+    """
+    name: str = 'synthetic'
+    modules: int = 100
+    classes: int = 3
+    methods: int = 5
+    functions: int = 5
+    aliases: int = 5
+    depth: int = 3
+    stubs: float = 0.2
+    exports: bool = True
+    group: int = 20
+
+    @property
+    def signatures(self) -> int:
+        """Number of the functions and methods."""
+        return self.modules * (self.classes * self.methods + self.functions)
+
+    def __module(self, i: int, stub: bool) -> str:
+        """Script of the module."""
+        body = ' ...' if stub else '\n        """Method."""'
+        fbody = ' ...' if stub else '\n    """Function."""'
+        s = [f'"""Module {i}."""',
+             "from typing import (",
+             "    Optional, Union, List, Dict, Tuple, Sequence, TypeVar,",
+             ")",
+             "from collections import OrderedDict",
+             "import os.path",
+             "T = TypeVar('T')",
+             f"CONSTANT_{i} = {i}"]
+        if self.exports:
+            names = [f"Class{i}_{c}" for c in range(self.classes)]
+            names += [f"func{i}_{f}" for f in range(self.functions)]
+            s.append(f"__all__ = {names!r}")
+        for a in range(self.aliases):
+            s.append(f"Alias{a} = {_annotation(self.depth, i + a)}")
+        for c in range(self.classes):
+            s.append(f"class Class{i}_{c}:")
+            s.append('    """Class."""')
+            s.append(f"    attr: {_annotation(self.depth, c)}")
+            for m in range(self.methods):
+                a = f"Alias{m % self.aliases}" if self.aliases else 'T'
+                s.append(f"    def method{m}(self, a: {a}, "
+                         f"b: {_annotation(self.depth, m)} = None, *, "
+                         f"c: 'T' = 0) -> {_annotation(self.depth, i)}:"
+                         + body)
+        for f in range(self.functions):
+            s.append(f"def func{i}_{f}(a: {_annotation(self.depth, f)}, "
+                     f"*args: int, **kwargs: T) -> Optional[T]:" + fbody)
+        s.append("def _private() -> None: ...")
+        return '\n'.join(s) + '\n'
+
+    def generate(self, path: str) -> None:
+        """Generate the package under the path."""
+        root = join(path, self.name)
+        makedirs(root)
+        init = ['"""Root package."""']
+        for i in range(self.modules):
+            sub = f"sub{i // self.group}"
+            if i % self.group == 0:
+                makedirs(join(root, sub))
+                with open(join(root, sub, '__init__.py'), 'w') as f:
+                    f.write(f'"""Subpackage {sub}."""\n')
+            if self.classes:
+                init.append(f"from .{sub}.mod{i} import Class{i}_0")
+            base = join(root, sub, f"mod{i}")
+            with open(base + '.py', 'w') as f:
+                f.write(self.__module(i, False))
+            if int((i + 1) * self.stubs) > int(i * self.stubs):
+                with open(base + '.pyi', 'w') as f:
+                    f.write(self.__module(i, True))
+        with open(join(root, '__init__.py'), 'w') as f:
+            f.write('\n'.join(init) + '\n')
+
+
+class _TimedParser(Parser):
+    """Parser which measures the time of annotation resolving."""
+    resolve_time = 0.
+
+    def resolve(self, root: str, node: expr, self_ty: str = "") -> str:
+        """Measure the time of `Parser.resolve`."""
+        t0 = perf_counter()
+        r = super(_TimedParser, self).resolve(root, node, self_ty)
+        self.resolve_time += perf_counter() - t0
+        return r
+
+
+def _best(f: Callable[[], object], repeat: int,
+          setup: Optional[Callable[[], object]] = None) -> tuple[float, object]:
+    """The best time of the function and its last result,
+    `setup` is called before each run without timing.
+    """
+    best = float('inf')
+    r = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = perf_counter()
+        r = f()
+        best = min(best, perf_counter() - t0)
+    return best, r
+
+
+def _parse(scripts: list[tuple[str, str, bool]]) -> _TimedParser:
+    """Parse the scripts with a new parser,
+    only fill the missing docstrings if the flag is true.
+    """
+    p = _TimedParser.new(True, 1, False)
+    for name, script, fill in scripts:
+        if fill:
+            p.fill_docstring(name, script)
+        else:
+            p.parse(name, script)
+    return p
+
+
+def run(spec: Synthetic, repeat: int = 1,
+        source: str = SOURCE) -> dict[str, object]:
+    """Run the benchmark with the specification, time each phase.
+
+    The source or stub of the modules are chosen by `source` as `gen_api`.
+
+    The best time of the `repeat` runs is reported in seconds,
+    and the peak memory of the parsing and compiling is measured separately.
+    """
+    from apimd import __version__
+    with TemporaryDirectory() as path:
+        spec.generate(path)
+        t_walk, modules = _best(
+            lambda: list(walk_packages(spec.name, path)), repeat)
+        assert isinstance(modules, list)
+
+        def read() -> list[tuple[str, str, bool]]:
+            scripts = []
+            for name, p in modules:
+                exts = [ext for ext in (".py", ".pyi") if isfile(p + ext)]
+                ext, fill = _select(exts, source)
+                for e, is_fill in ((ext, False), (fill, True)):
+                    if e:
+                        scripts.append((name, _read(p + e), is_fill))
+            return scripts
+
+        t_read, scripts = _best(read, repeat)
+    assert isinstance(scripts, list)
+    t_parse, p = _best(lambda: _parse(scripts), repeat)
+    assert isinstance(p, _TimedParser)
+    t_resolve = p.resolve_time
+
+    def clear() -> None:
+        """The rendered sections and the alias substitution are not
+        reused by the next run.
+        """
+        p.sections.clear()
+        p.alias_view.invalidate()
+
+    t_compile, doc = _best(p.compile, repeat, clear)
+    assert isinstance(doc, str)
+    # Peak memory
+    start()
+    _parse(scripts).compile()
+    _, peak = get_traced_memory()
+    stop()
+    return {
+        'version': __version__,
+        'spec': asdict(spec),
+        'source': source,
+        'modules': len(modules),
+        'files': len(scripts),
+        'signatures': spec.signatures,
+        'output_size': len(doc),
+        'time': {
+            'walk': t_walk,
+            'read': t_read,
+            'parse': t_parse,
+            'resolve': t_resolve,
+            'compile': t_compile,
+        },
+        'throughput': {
+            'modules_per_second': len(modules) / t_parse,
+            'signatures_per_second': spec.signatures / t_parse,
+            'compile_modules_per_second': len(modules) / t_compile,
+        },
+        'peak_memory': peak,
+        'resolve_cache': {
+            'hit': p.resolve_cache.hit,
+            'miss': p.resolve_cache.miss,
+        },
+    }
+
+
+def report(result: dict[str, object]) -> str:
+    """Format the result as a table."""
+    t = result['time']
+    tp = result['throughput']
+    assert isinstance(t, dict) and isinstance(tp, dict)
+    lines = [f"apimd {result['version']}: {result['modules']} modules, "
+             f"{result['files']} files ({result['source']}), "
+             f"{result['signatures']} signatures",
+             f"{'phase':<10}{'time (ms)':>12}"]
+    for phase, s in t.items():
+        note = " (in parse)" if phase == 'resolve' else ""
+        lines.append(f"{phase:<10}{s * 1e3:>12.3f}{note}")
+    lines.append(f"parse:   {tp['modules_per_second']:.1f} modules/s, "
+                 f"{tp['signatures_per_second']:.1f} signatures/s")
+    lines.append(f"compile: {tp['compile_modules_per_second']:.1f} modules/s")
+    peak = result['peak_memory']
+    assert isinstance(peak, int)
+    lines.append(f"peak memory: {peak / 1024 / 1024:.2f} MB")
+    return '\n'.join(lines)
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Main function."""
+    parser = ArgumentParser(
+        prog="python -m apimd.bench",
+        description="Benchmark apimd with a synthetic package."
+    )
+    default = Synthetic()
+    for opt, h in [
+        ('modules', "number of modules"),
+        ('classes', "number of classes per module"),
+        ('methods', "number of methods per class"),
+        ('functions', "number of functions per module"),
+        ('aliases', "number of type aliases per module"),
+        ('depth', "nested depth of annotations"),
+        ('group', "number of modules per subpackage"),
+    ]:
+        parser.add_argument(f'--{opt}', metavar="N", type=int,
+                            default=getattr(default, opt), help=h)
+    parser.add_argument('--stubs', metavar="RATIO", type=float,
+                        default=default.stubs,
+                        help="ratio of modules with stub files")
+    parser.add_argument('--no-exports', action='store_true',
+                        help="don't generate `__all__` lists")
+    parser.add_argument('--source', default=SOURCE, choices=SOURCES,
+                        help="parse the stub or the source if both exist, "
+                             f"same as apimd, default to \"{SOURCE}\"")
+    parser.add_argument('--repeat', metavar="N", type=int, default=3,
+                        help="report the best time of N runs")
+    parser.add_argument('--json', metavar="FILE", default=None, type=str,
+                        help="dump the result as JSON, \"-\" for stdout")
+    arg = parser.parse_args(args)
+    spec = Synthetic(modules=arg.modules, classes=arg.classes,
+                     methods=arg.methods, functions=arg.functions,
+                     aliases=arg.aliases, depth=arg.depth, stubs=arg.stubs,
+                     exports=not arg.no_exports, group=arg.group)
+    disable(WARNING)
+    result = run(spec, arg.repeat, arg.source)
+    if arg.json == '-':
+        dump(result, stdout, indent=2)
+        return
+    print(report(result))
+    if arg.json is not None:
+        with open(arg.json, 'w+', encoding='utf-8') as f:
+            dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""Persistent cache of the parsed modules."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from collections.abc import Sequence, Iterator
+from contextlib import contextmanager
+from os import (
+    O_CREAT, O_EXCL, O_WRONLY, makedirs, remove, replace, scandir, stat,
+    open as os_open, close as os_close,
+)
+from os.path import isfile, join
+from time import time, sleep
+from dataclasses import fields
+from hashlib import sha1, sha256
+from json import load as json_load, dump as json_dump
+from importlib.machinery import EXTENSION_SUFFIXES
+from pickle import load, dump, HIGHEST_PROTOCOL
+from .logger import logger
+from .parser import Parser
+from .defaults import CACHE_SIZE
+
+_INDEX = 'index.json'
+_LOCK = 'index.lock'
+_EXTS = (".py", ".pyi")
+# Seconds to keep the files which are not in the index,
+# since they may be written by another running cache
+_GRACE = 3600
+# Seconds to take the lock as a stale one of a killed process
+_LOCK_TIMEOUT = 30
+
+
+def _atomic(path: str) -> str:
+    """Temporary file path beside `path` for the atomic writing."""
+    return path + '.tmp'
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold the lock file `path`, which is created exclusively.
+
+    Wait if the lock is held by another process,
+    but the stale lock is broken after `_LOCK_TIMEOUT` seconds.
+    """
+    while True:
+        try:
+            fd = os_open(path, O_CREAT | O_EXCL | O_WRONLY)
+        except FileExistsError:
+            try:
+                if time() - stat(path).st_mtime > _LOCK_TIMEOUT:
+                    logger.warning("break stale cache lock: %s", path)
+                    remove(path)
+                    continue
+            except OSError:
+                continue
+            sleep(0.05)
+        else:
+            os_close(fd)
+            break
+    try:
+        yield
+    finally:
+        try:
+            remove(path)
+        except OSError:
+            pass
+
+
+def _read_index(path: str) -> dict[str, dict]:
+    """Read the index file, an empty index if not exist or broken."""
+    if not isfile(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json_load(f)
+    except (OSError, ValueError):
+        logger.warning("broken cache index: %s", path)
+        return {}
+
+
+class Cache:
+    """Cache the parser state of each module in a directory.
+
+    The entries are keyed by module path, size and modified time,
+    and the content hash is used when the time is changed but not the content.
+    An entry is valid only for the same apimd version and parser options.
+    The docstrings of the extension modules are cached by the binaries.
+    The directory can be shared by the concurrent caches,
+    their indexes are merged when closing.
+
+    Usage:
+    >>> cache = Cache(CACHE_DIR, link=True, level=1, toc=False,
+    >>>               source='merge')
+    >>> result = cache.load(name, path)
+    >>> if result is None:
+    >>>     cache.save(name, path, parse_module(name, path))
+    >>> cache.close()
+    """
+
+    def __init__(self, path: str, *, link: bool, level: int, toc: bool,
+                 source: str, max_size: int = CACHE_SIZE):
+        """Open cache directory `path` for the parser options."""
+        from apimd import __version__
+        self.path = path
+        self.max_size = max_size
+        # The parser fields are included for the format of the entries
+        fmt = ','.join(f.name for f in fields(Parser))
+        self.version = f"{__version__}:{link}:{level}:{toc}:{source}:{fmt}"
+        self.hit = 0
+        self.miss = 0
+        makedirs(path, exist_ok=True)
+        self.index = _read_index(join(path, _INDEX))
+
+    def __key(self, name: str, path: str, *names: str) -> str:
+        """Entry name of the module."""
+        key = ':'.join([self.version, name, path, *names])
+        return sha1(key.encode()).hexdigest()
+
+    @staticmethod
+    def __stat(path: str, exts: Sequence[str]) -> dict[str, list[int]]:
+        """Size and modified time of the files with the extensions."""
+        st = {}
+        for ext in exts:
+            try:
+                s = stat(path + ext)
+            except OSError:
+                continue
+            st[ext] = [s.st_size, s.st_mtime_ns]
+        return st
+
+    @staticmethod
+    def __hash(path: str, exts: Sequence[str]) -> str:
+        """Content hash of the files with the extensions."""
+        h = sha256()
+        for ext in exts:
+            with open(path + ext, 'rb') as f:
+                h.update(f.read())
+        return h.hexdigest()
+
+    def __load(self, key: str, path: str, exts: Sequence[str]) -> object:
+        """Load the entry if the files are unchanged, or return `None`."""
+        entry = self.index.get(key)
+        if entry is None:
+            self.miss += 1
+            return None
+        st = self.__stat(path, exts)
+        if st != entry['stat']:
+            if (
+                st.keys() != entry['stat'].keys()
+                or self.__hash(path, list(st)) != entry['hash']
+            ):
+                self.miss += 1
+                return None
+            entry['stat'] = st
+        try:
+            with open(join(self.path, key), 'rb') as f:
+                result = load(f)
+        except (OSError, EOFError, ValueError):
+            self.index.pop(key)
+            self.miss += 1
+            return None
+        entry['used'] = time()
+        self.hit += 1
+        return result
+
+    def __save(self, key: str, path: str, exts: Sequence[str],
+               result: object) -> None:
+        """Save the entry with the state of the files."""
+        entry_path = join(self.path, key)
+        with open(_atomic(entry_path), 'wb') as f:
+            dump(result, f, HIGHEST_PROTOCOL)
+        replace(_atomic(entry_path), entry_path)
+        st = self.__stat(path, exts)
+        self.index[key] = {
+            'version': self.version,
+            'path': path,
+            'stat': st,
+            'hash': self.__hash(path, list(st)),
+            'size': stat(entry_path).st_size,
+            'used': time(),
+        }
+
+    def load(self, name: str, path: str) -> Optional[tuple[Parser, bool]]:
+        """Load the parser state of the module if it is unchanged."""
+        result = self.__load(self.__key(name, path), path, _EXTS)
+        assert result is None or isinstance(result, tuple)
+        return result
+
+    def save(self, name: str, path: str, result: tuple[Parser, bool]) -> None:
+        """Save the parser state of the module."""
+        self.__save(self.__key(name, path), path, _EXTS, result)
+
+    def load_docstring(self, name: str, path: str,
+                       names: Sequence[str]) -> Optional[dict[str, str]]:
+        """Load the docstrings of the names from the extension module
+        if the binaries are unchanged.
+        """
+        key = self.__key(name, path, 'extension', *names)
+        result = self.__load(key, path, EXTENSION_SUFFIXES)
+        assert result is None or isinstance(result, dict)
+        return result
+
+    def save_docstring(self, name: str, path: str, names: Sequence[str],
+                       docs: dict[str, str]) -> None:
+        """Save the docstrings of the names from the extension module."""
+        key = self.__key(name, path, 'extension', *names)
+        self.__save(key, path, EXTENSION_SUFFIXES, docs)
+
+    def __evict(self, key: str) -> None:
+        """Remove the entry."""
+        entry = self.index.pop(key)
+        logger.debug("evict cache: %s", entry['path'])
+        try:
+            remove(join(self.path, key))
+        except OSError:
+            pass
+
+    def __merge(self, index: dict[str, dict]) -> None:
+        """Merge the index saved by other caches,
+        the recently used entries are kept.
+        """
+        for key, entry in index.items():
+            if (
+                key not in self.index
+                or entry['used'] > self.index[key]['used']
+            ):
+                self.index[key] = entry
+
+    def __sweep(self) -> None:
+        """Remove the files which are not in the index, such as the entries
+        of an interrupted run, except the recent ones.
+        """
+        now = time()
+        for e in scandir(self.path):
+            if e.name in self.index or e.name in {_INDEX, _LOCK}:
+                continue
+            try:
+                if now - e.stat().st_mtime > _GRACE:
+                    logger.debug("remove unindexed cache: %s", e.name)
+                    remove(e.path)
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """Evict the entries of the deleted files, the other apimd versions,
+        the lost entry files and the least recently used entries over
+        the size cap, then remove the files which are not in the index.
+        """
+        from apimd import __version__
+        for key, entry in list(self.index.items()):
+            if (
+                not entry['version'].startswith(__version__ + ':')
+                or not any(isfile(entry['path'] + ext)
+                           for ext in entry['stat'])
+                or not isfile(join(self.path, key))
+            ):
+                self.__evict(key)
+        size = sum(entry['size'] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]['used']):
+            if size <= self.max_size:
+                break
+            size -= self.index[key]['size']
+            self.__evict(key)
+        self.__sweep()
+
+    def close(self) -> None:
+        """Merge the index saved by other caches, evict the entries,
+        then write the index. The directory is locked meanwhile.
+        """
+        index = join(self.path, _INDEX)
+        with _locked(join(self.path, _LOCK)):
+            self.__merge(_read_index(index))
+            self.evict()
+            with open(_atomic(index), 'w', encoding='utf-8') as f:
+                json_dump(self.index, f)
+            replace(_atomic(index), index)
+        logger.debug("cache: %s hit, %s miss", self.hit, self.miss)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+"""Default options, which can be imported without the compiler modules."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+CACHE_DIR = '.apimd_cache'
+CACHE_SIZE = 256 * 1024 * 1024
+EXT_TIMEOUT = 60.
+SOURCES = ('stub-first', 'source-first', 'merge')
+SOURCE = 'stub-first'
+PORT = 8000
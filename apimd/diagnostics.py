@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""Aggregated warnings of the documentation builds."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from collections import Counter
+from collections.abc import Iterable
+from json import dump
+
+TOP = 20
+KINDS = {
+    'deprecated': "deprecated name (PEP 585)",
+    'undocumented': "missing documentation",
+}
+
+
+class WarningLimitError(RuntimeError):
+    """The number of warnings exceeds the limit."""
+
+
+class Warnings(Counter[tuple[str, str, str]]):
+    """Count the warnings by kind, name and module.
+
+    The kinds are listed in `KINDS`.
+
+    Usage:
+    >>> w = Warnings()
+    >>> w.add('undocumented', 'pkg.func', 'pkg')
+    >>> print(w.summary())
+    """
+
+    def add(self, kind: str, name: str, module: str) -> None:
+        """Count a warning."""
+        self[kind, name, module] += 1
+
+    def remove(self, module: Optional[str] = None,
+               kind: Optional[str] = None) -> None:
+        """Remove the warnings of the module and the kind,
+        or all of them if not specified.
+        """
+        for key in [key for key in self
+                    if module in {None, key[2]} and kind in {None, key[0]}]:
+            del self[key]
+
+    def total(self) -> int:
+        """The number of warnings."""
+        return sum(self.values())
+
+    def ranking(self) -> list[tuple[tuple[str, str, str], int]]:
+        """The warnings in descending order of the counts,
+        then by kind, module and name.
+        """
+        return sorted(self.items(),
+                      key=lambda w: (-w[1], w[0][0], w[0][2], w[0][1]))
+
+    def summary(self, top: int = TOP) -> str:
+        """The most frequent warnings as a table."""
+        rows = self.ranking()
+        lines = [f"{self.total()} warning(s) of {len(rows)} name(s):",
+                 f"{'count':>7}  {'kind':<26}{'module':<30}name"]
+        for (kind, name, module), n in rows[:top]:
+            lines.append(f"{n:>7}  {KINDS.get(kind, kind):<26}"
+                         f"{module:<30}{name}")
+        if len(rows) > top:
+            lines.append(f"... {len(rows) - top} more name(s)")
+        return '\n'.join(lines)
+
+    def result(self) -> dict[str, object]:
+        """The warnings in JSON compatible format."""
+        return {
+            'total': self.total(),
+            'warnings': [{'kind': kind, 'name': name, 'module': module,
+                          'count': n}
+                         for (kind, name, module), n in self.ranking()],
+        }
+
+    def dump(self, path: str) -> None:
+        """Dump the warnings as JSON."""
+        with open(path, 'w+', encoding='utf-8') as f:
+            dump(self.result(), f, indent=2)
+
+    @classmethod
+    def collect(cls, warnings: Iterable[Counter]) -> 'Warnings':
+        """Sum the warnings."""
+        w = cls()
+        for c in warnings:
+            w.update(c)
+        return w
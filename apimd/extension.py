@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""Load the docstrings from the extension modules in subprocesses.
+
+The extension modules are imported in the worker processes,
+so the slow, heavy or crashing modules will not affect apimd.
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional, Any
+from collections.abc import Sequence
+from os import dup, dup2, cpu_count
+from os.path import isfile
+from sys import executable, path as sys_path
+from json import dumps, loads
+from importlib.machinery import EXTENSION_SUFFIXES
+from importlib.util import spec_from_file_location, module_from_spec
+from .logger import logger
+from .parser import parent, docstrings
+from .cache import Cache
+from .defaults import EXT_TIMEOUT
+
+# The path is set before importing apimd, so the modules are resolved
+# as the requester
+_WORKER = """\
+import sys, json
+request = json.loads(sys.stdin.read())
+sys.path[:] = request['sys_path']
+from apimd.extension import worker
+worker(request)
+"""
+
+
+def extension_paths(path: str) -> list[str]:
+    """The extension files of the module path for this platform."""
+    return [path + ext for ext in EXTENSION_SUFFIXES if isfile(path + ext)]
+
+
+def load_module(name: str, paths: Sequence[str],
+                names: Sequence[str]) -> Optional[dict[str, str]]:
+    """Import the module from the first loadable extension file,
+    then get the docstrings of the names.
+
+    Return `None` if the module can not be loaded.
+    This function should be called in the worker process.
+    """
+    from importlib.abc import Loader
+    # Load root first to avoid import error
+    try:
+        __import__(parent(name))
+    except ImportError:
+        return None
+    for path in paths:
+        s = spec_from_file_location(name, path)
+        if s is not None and isinstance(s.loader, Loader):
+            m = module_from_spec(s)
+            s.loader.exec_module(m)
+            return docstrings(name, m, names)
+    return None
+
+
+def worker(request: dict[str, Any]) -> None:
+    """Entry of the worker process.
+
+    The request is read from stdin and `sys.path` is set by `_WORKER`,
+    and the result is written to stdout as JSON.
+    The other outputs are redirected to stderr.
+    """
+    import sys
+    out = dup(1)
+    dup2(2, 1)
+    sys.stdout = sys.stderr
+    docs = load_module(request['name'], request['paths'], request['names'])
+    with open(out, 'w', encoding='utf-8') as f:
+        f.write(dumps(docs))
+
+
+def _run(name: str, paths: Sequence[str], names: Sequence[str],
+         timeout: float) -> Optional[dict[str, str]]:
+    """Load the docstrings in a new worker process."""
+    from subprocess import run, TimeoutExpired
+    request = dumps({'name': name, 'paths': paths, 'names': names,
+                     'sys_path': sys_path})
+    try:
+        r = run([executable, '-c', _WORKER], input=request,
+                capture_output=True, text=True, encoding='utf-8',
+                timeout=timeout)
+    except TimeoutExpired:
+        logger.warning("loading %s timed out after %s seconds", name, timeout)
+        return None
+    if r.returncode != 0:
+        err = r.stderr.strip().splitlines()
+        logger.warning("failed to load %s: %s", name,
+                       err[-1] if err else f"exit code {r.returncode}")
+        return None
+    docs = loads(r.stdout)
+    if docs is None:
+        logger.warning("no module for %s in this platform", name)
+    return docs
+
+
+def load_extensions(
+    modules: Sequence[tuple[str, str, Sequence[str]]],
+    *,
+    jobs: int = 1,
+    timeout: float = EXT_TIMEOUT,
+    cache: Optional[Cache] = None
+) -> list[Optional[dict[str, str]]]:
+    """Load the docstrings of the `(name, path, names)` extension modules
+    in order, or `None` if the module can not be loaded.
+
+    Each module is imported in a worker process within `timeout` seconds,
+    at most `jobs` processes are running at the same time,
+    zero or negative value means using all processors.
+    The docstrings are loaded from `cache` if the binaries are unchanged.
+    """
+    results: list[Optional[dict[str, str]]] = []
+    todo = []
+    for i, (name, path, names) in enumerate(modules):
+        paths = extension_paths(path)
+        for path_ext in paths:
+            logger.debug("%s <= %s", name, path_ext)
+        docs = None
+        if not paths:
+            logger.warning("no module for %s in this platform", name)
+        elif cache is not None:
+            docs = cache.load_docstring(name, path, names)
+        if paths and docs is None:
+            todo.append((i, name, paths, names))
+        results.append(docs)
+    if not todo:
+        return results
+    if jobs < 1:
+        jobs = cpu_count() or 1
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(min(jobs, len(todo))) as executor:
+        futures = [executor.submit(_run, name, paths, names, timeout)
+                   for _, name, paths, names in todo]
+        for (i, name, _, names), future in zip(todo, futures):
+            docs = future.result()
+            if docs is not None and cache is not None:
+                cache.save_docstring(name, modules[i][1], names, docs)
+            results[i] = docs
+    return results
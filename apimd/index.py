@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""Serializable API index of the parsed packages."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import IO, cast
+from collections.abc import Iterable
+from os import replace
+from gzip import open as gzip_open
+from json import load, dump
+from .parser import Parser
+
+INDEX_FORMAT = 1
+
+
+def _open(path: str, mode: str, gz: bool) -> IO[str]:
+    """Open the text file, compressed by gzip if `gz` is true."""
+    if gz:
+        return cast(IO[str], gzip_open(path, mode + 't', encoding='utf-8'))
+    return open(path, mode, encoding='utf-8')
+
+
+def save_index(path: str, packages: Iterable[tuple[str, str, Parser]]) -> None:
+    """Save the `(title, name, parser)` packages to the index file atomically.
+
+    The file is JSON, compressed by gzip if the suffix is ".gz".
+    """
+    from apimd import __version__
+    index = {
+        'format': INDEX_FORMAT,
+        'version': __version__,
+        'packages': {name: {'title': title, **p.to_index()}
+                     for title, name, p in packages},
+    }
+    tmp = path + '.tmp'
+    with _open(tmp, 'w', path.endswith('.gz')) as f:
+        dump(index, f, separators=(',', ':'))
+    replace(tmp, path)
+
+
+def load_index(path: str, link: bool, level: int,
+               toc: bool) -> list[tuple[str, str, Parser]]:
+    """Load the `(title, name, parser)` packages from the index file,
+    the parsers are created by the options.
+
+    Raise `ValueError` if the format is not supported.
+    """
+    with _open(path, 'r', path.endswith('.gz')) as f:
+        index = load(f)
+    if index.get('format') != INDEX_FORMAT:
+        raise ValueError(f"unsupported index format: {path}")
+    return [(pkg['title'], name, Parser.from_index(pkg, link, level, toc))
+            for name, pkg in index['packages'].items()]
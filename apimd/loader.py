@@ -7,18 +7,32 @@ __copyright__ = "Copyright (C) 2020-2021"
 __license__ = "MIT"
 __email__ = "pyslvs@gmail.com"
 
-from typing import Optional
-from collections.abc import Sequence, Iterator
+from typing import TypeVar, Optional, Any
+from itertools import chain, repeat
+from hashlib import sha256
+from collections.abc import Callable, Sequence, Iterable, Iterator
 from sys import path as sys_path
-from os import mkdir, walk
+from time import sleep
+from logging import Handler, LogRecord
+from os import mkdir, scandir, stat, remove, replace, cpu_count
 from os.path import isdir, isfile, abspath, join, sep, dirname
-from importlib.abc import Loader
-from importlib.machinery import EXTENSION_SUFFIXES
-from importlib.util import find_spec, spec_from_file_location, module_from_spec
-from .logger import logger
-from .parser import parent, Parser
+from contextlib import ExitStack
+from importlib.util import find_spec
+from ast import parse
+from .logger import logger, set_level
+from .parser import _Keys, _Sections, parent, Parser
+from .cache import CACHE_SIZE, Cache
+from .profiler import Profiler, phase
+from .diagnostics import WarningLimitError, Warnings
+from .extension import EXT_TIMEOUT
+from .defaults import SOURCES, SOURCE
+from .archive import (
+    PEP561_SUFFIX, is_archive, archive_packages, walk_archive,
+)
 
-PEP561_SUFFIX = '-stubs'
+_T = TypeVar('_T')
+_Stat = tuple[tuple[str, int, int], ...]
+_Snapshot = dict[str, tuple[list[str], _Stat]]
 
 
 def _read(path: str) -> str:
@@ -27,83 +41,785 @@ def _read(path: str) -> str:
         return f.read()
 
 
-def _write(path: str, doc: str) -> None:
-    """Write text to the file."""
-    with open(path, 'w+', encoding='utf-8') as f:
-        f.write(doc)
+def _digest(chunks: Iterable[str]) -> str:
+    """Content hash of the text chunks."""
+    h = sha256()
+    for chunk in chunks:
+        h.update(chunk.encode('utf-8'))
+    return h.hexdigest()
 
 
-def _site_path(name: str) -> str:
-    """Get the path in site-packages if exist."""
+def _file_digest(path: str) -> str:
+    """Content hash of the text file, empty string if not exist."""
+    if not isfile(path):
+        return ""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return _digest(iter(lambda: f.read(1 << 16), ""))
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+
+def _write_iter(path: str, chunks: Iterable[str],
+                changed: bool = False) -> bool:
+    """Write text chunks to the file atomically.
+
+    Return false if the content is unchanged, the file will be untouched.
+    The content is not compared again if it is known to be `changed`.
+    """
+    h = None if changed else sha256()
+    tmp = path + '.tmp'
+    with open(tmp, 'w+', encoding='utf-8') as f:
+        for chunk in chunks:
+            if h is not None:
+                h.update(chunk.encode('utf-8'))
+            f.write(chunk)
+    if h is not None and h.hexdigest() == _file_digest(path):
+        remove(tmp)
+        return False
+    replace(tmp, path)
+    return True
+
+
+def _write(path: str, doc: str) -> bool:
+    """Write text to the file atomically if the content is changed."""
+    if _digest([doc]) == _file_digest(path):
+        return False
+    return _write_iter(path, [doc], True)
+
+
+def _nonblank(chunks: Iterable[str]) -> Optional[Iterator[str]]:
+    """Return the chunks if any of them is not blank."""
+    it = iter(chunks)
+    head = []
+    for chunk in it:
+        head.append(chunk)
+        if chunk.strip():
+            return chain(head, it)
+    return None
+
+
+def _site_paths(name: str) -> list[str]:
+    """Get the parent paths of all portions of the package if exist.
+
+    Namespace packages (PEP 420) may have more than one portion.
+    """
     s = find_spec(name)
     if s is None or s.submodule_search_locations is None:
-        return ""
-    return dirname(s.submodule_search_locations[0])
+        return []
+    return [dirname(p) for p in s.submodule_search_locations]
+
+
+def _site_path(name: str) -> str:
+    """Get the path in site-packages if exist."""
+    paths = _site_paths(name)
+    return paths[0] if paths else ""
+
+
+def _scan(path: str) -> Iterator[str]:
+    """Scan the scripts under the directory in order, without extension.
+
+    Only the directory itself and its subdirectories are visited,
+    the linked subdirectories are not followed as `os.walk`.
+    """
+    try:
+        entries = sorted(scandir(path), key=lambda e: e.name)
+    except OSError:
+        return
+    dirs = []
+    scripts = []
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            dirs.append(e.path)
+        elif e.name.endswith(('.py', '.pyi')):
+            f_path = parent(e.path)
+            if f_path not in scripts:
+                scripts.append(f_path)
+    yield from scripts
+    for d in dirs:
+        yield from _scan(d)
+
+
+def walk_packages(name: str, *paths: str) -> Iterator[tuple[str, str]]:
+    """Walk packages without import them.
+
+    Only the package `name` and its stub package `name-stubs` are visited
+    in each path, the unrelated packages beside them are never listed.
+    """
+    visited = set()
+    for path in paths:
+        path = abspath(path) + sep
+        if path in visited:
+            continue
+        visited.add(path)
+        for pkg in (name, name + PEP561_SUFFIX):
+            pkg_path = path + pkg
+            if isfile(pkg_path + '.py') or isfile(pkg_path + '.pyi'):
+                yield name, pkg_path
+            for f_path in _scan(pkg_path):
+                yield (f_path
+                       .removeprefix(path)
+                       .replace(PEP561_SUFFIX, "")
+                       .replace(sep, '.')
+                       .removesuffix('.__init__')), f_path
 
 
-def walk_packages(name: str, path: str) -> Iterator[tuple[str, str]]:
-    """Walk packages without import them."""
-    path = abspath(path) + sep
-    valid = (path + name, path + name + PEP561_SUFFIX)
-    for root, _, fs in walk(path):
-        for f in fs:
-            if not f.endswith(('.py', '.pyi')):
+def _select(exts: Iterable[str], source: str) -> tuple[str, str]:
+    """Choose the extension to parse and the extension to fill
+    the docstrings by the `source` policy, empty string if not used.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"invalid source policy: {source}")
+    exts = set(exts)
+    if len(exts) < 2:
+        return (exts.pop() if exts else ""), ""
+    if source == 'source-first':
+        return ".py", ""
+    return ".pyi", (".py" if source == 'merge' else "")
+
+
+def _parse_script(name: str, script: str, p: Parser,
+                  prof: Optional[Profiler], fill: bool = False) -> None:
+    """Parse the script of the module, time each step if profiling.
+
+    Only fill the missing docstrings if `fill` is true.
+    """
+    if prof is None:
+        if fill:
+            p.fill_docstring(name, script)
+        else:
+            p.parse(name, script)
+        return
+    with prof.phase('ast'):
+        root_node = parse(script, type_comments=True)
+    with prof.phase('analyze'), prof.resolving(p):
+        if fill:
+            p.fill_docstring_tree(name, root_node)
+        else:
+            p.parse_tree(name, root_node)
+
+
+def _parse_file(name: str, path: str, p: Parser,
+                prof: Optional[Profiler], fill: bool = False) -> None:
+    """Parse the file of the module, time each step if profiling."""
+    if prof is None:
+        _parse_script(name, _read(path), p, prof, fill)
+        return
+    with prof.module(name):
+        with prof.phase('read'):
+            script = _read(path)
+        _parse_script(name, script, p, prof, fill)
+
+
+def _parse_archive(root: str, path: str, p: Parser,
+                   prof: Optional[Profiler], source: str = SOURCE) -> None:
+    """Parse the package from the archive, time each step if profiling."""
+    with phase(prof, 'read'):
+        modules = list(walk_archive(path, root))
+    for name, scripts in modules:
+        ext, fill = _select(scripts, source)
+        for e, is_fill in ((ext, False), (fill, True)):
+            if not e:
                 continue
-            f_path = parent(join(root, f))
-            if not f_path.startswith(valid):
+            if prof is None:
+                _parse_script(name, scripts[e], p, prof, is_fill)
                 continue
-            name = (f_path
-                    .removeprefix(path)
-                    .replace(PEP561_SUFFIX, "")
-                    .replace(sep, '.')
-                    .removesuffix('.__init__'))
-            yield name, f_path
+            with prof.module(name):
+                _parse_script(name, scripts[e], p, prof, is_fill)
+
+
+def _parse(name: str, path: str, p: Parser,
+           prof: Optional[Profiler] = None, source: str = SOURCE) -> bool:
+    """Parse the source or stub of the module by the `source` policy.
+
+    Return true if the module is pure Python.
+    """
+    exts = [ext for ext in (".py", ".pyi") if isfile(path + ext)]
+    ext, fill = _select(exts, source)
+    if ext:
+        logger.debug("%s <= %s", name, path + ext)
+        _parse_file(name, path + ext, p, prof)
+    if fill:
+        logger.debug("%s <= %s (docstrings)", name, path + fill)
+        _parse_file(name, path + fill, p, prof, fill=True)
+    return ".py" in exts
+
+
+class _Records(Handler):
+    """Keep the log records with the formatted messages,
+    so they can be sent back from the worker processes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[LogRecord] = []
+
+    def emit(self, record: LogRecord) -> None:
+        """Format the message and keep the record."""
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
 
 
-def _load_module(name: str, path: str, p: Parser) -> bool:
-    """Load module directly."""
-    # Load root first to avoid import error
+def _captured(f: Callable[..., _T], *args: Any) -> tuple[_T, list[LogRecord]]:
+    """Call the function in the worker process and return the log records
+    instead of emitting them, so they can be emitted in order by `_replay`.
+    """
+    records = _Records()
+    handlers = logger.handlers
+    logger.handlers = [records]
     try:
-        __import__(parent(name))
-    except ImportError:
-        return False
-    s = spec_from_file_location(name, path)
-    if s is not None and isinstance(s.loader, Loader):
-        m = module_from_spec(s)
-        s.loader.exec_module(m)
-        p.load_docstring(name, m)
-        return True
-    return False
+        result = f(*args)
+    finally:
+        logger.handlers = handlers
+    return result, records.records
+
+
+def _replay(result: tuple[_T, list[LogRecord]]) -> _T:
+    """Emit the log records of `_captured` and return the result."""
+    result, records = result
+    for record in records:
+        logger.handle(record)
+    return result
 
 
-def loader(root: str, pwd: str, link: bool, level: int, toc: bool) -> str:
-    """Package searching algorithm."""
+def _parse_alone(name: str, path: str, link: bool, level: int,
+                 toc: bool, source: str) -> tuple[Parser, bool]:
+    """Parse the module with a new parser, for the worker processes."""
     p = Parser.new(link, level, toc)
-    for name, path in walk_packages(root, pwd):
-        # Load its source or stub
-        pure_py = False
-        for ext in [".py", ".pyi"]:
-            path_ext = path + ext
-            if not isfile(path_ext):
+    return p, _parse(name, path, p, source=source)
+
+
+def _parse_captured(
+    name: str,
+    path: str,
+    link: bool,
+    level: int,
+    toc: bool,
+    source: str
+) -> tuple[tuple[Parser, bool], list[LogRecord]]:
+    """Parse the module with a new parser, and capture the log records."""
+    return _captured(_parse_alone, name, path, link, level, toc, source)
+
+
+def _parse_partials(
+    modules: Sequence[tuple[str, str]],
+    link: bool,
+    level: int,
+    toc: bool,
+    jobs: int,
+    cache: Optional[Cache],
+    source: str = SOURCE
+) -> Iterator[Optional[tuple[Parser, bool]]]:
+    """Parse the modules into partial parsers, yield them in the order of
+    `modules`. The modules are loaded from `cache` if unchanged,
+    and the rest are parsed in the process pool if `jobs` is not 1.
+
+    The repeated module names (source and stub packages) yield `None`,
+    they should be parsed with the merged state.
+    """
+    seen = set()
+    cached = []
+    todo = []
+    for name, path in modules:
+        if name in seen:
+            continue
+        seen.add(name)
+        partial = None if cache is None else cache.load(name, path)
+        if partial is None:
+            todo.append((name, path))
+        cached.append(partial)
+    if jobs <= 0:
+        jobs = cpu_count() or 1
+    with ExitStack() as stack:
+        results: Iterator[tuple[tuple[Parser, bool], list[LogRecord]]]
+        if not todo:
+            results = iter(())
+        elif jobs == 1 or len(todo) < 2:
+            results = map(_parse_captured, *zip(*todo), repeat(link),
+                          repeat(level), repeat(toc), repeat(source))
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = stack.enter_context(ProcessPoolExecutor(
+                jobs, initializer=set_level, initargs=(logger.level,)))
+            results = executor.map(
+                _parse_captured, *zip(*todo), repeat(link), repeat(level),
+                repeat(toc), repeat(source),
+                chunksize=max(1, len(todo) // (4 * jobs)))
+        seen.clear()
+        it = iter(cached)
+        for name, path in modules:
+            if name in seen:
+                yield None
                 continue
-            logger.debug(f"{name} <= {path_ext}")
-            p.parse(name, _read(path_ext))
-            if ext == ".py":
-                pure_py = True
-        if pure_py:
+            seen.add(name)
+            partial = next(it)
+            if partial is None:
+                partial = _replay(next(results))
+                if cache is not None:
+                    cache.save(name, path, partial)
+            yield partial
+
+
+def _load_extensions(
+    modules: Sequence[tuple[Parser, str, str, Sequence[str]]],
+    *,
+    jobs: int = 1,
+    timeout: float = EXT_TIMEOUT,
+    cache: Optional[Cache] = None
+) -> None:
+    """Load the docstrings of the names from the extension modules
+    into their parsers, see `load_extensions`.
+    """
+    if not modules:
+        return
+    from .extension import load_extensions
+    logger.debug("loading extension modules for fully documented:")
+    for p, docs in zip(
+        (p for p, _, _, _ in modules),
+        load_extensions([m[1:] for m in modules], jobs=jobs, timeout=timeout,
+                        cache=cache)
+    ):
+        if docs is not None:
+            p.set_docstring(docs)
+
+
+def _discover(root: str, pwd: str) -> list[tuple[str, str]]:
+    """Find the modules of the package, the archives are walked later."""
+    if is_archive(pwd):
+        return []
+    return list(walk_packages(root, pwd, *_site_paths(root)))
+
+
+def _load_roots(
+    roots: Sequence[tuple[str, str]],
+    link: bool,
+    level: int,
+    toc: bool,
+    *,
+    jobs: int = 1,
+    cache: Optional[Cache] = None,
+    ext_timeout: float = EXT_TIMEOUT,
+    source: str = SOURCE,
+    prof: Optional[Profiler] = None
+) -> list[Parser]:
+    """Load the `(root, pwd)` packages into parsers in order, see `loader`.
+
+    All packages are discovered first, then their modules and extension
+    modules are loaded together, so the workers are shared by the packages.
+    If `pwd` is an archive, the package is parsed from it directly.
+    """
+    with phase(prof, 'discover'):
+        modules = [_discover(root, pwd) for root, pwd in roots]
+    serial = jobs == 1 and cache is None
+    if serial:
+        partials: Iterator[Optional[tuple[Parser, bool]]] = repeat(None)
+    else:
+        partials = _parse_partials(list(chain.from_iterable(modules)), link,
+                                   level, toc, jobs, cache, source)
+    parsers = []
+    extensions = []
+    for (root, pwd), package in zip(roots, modules):
+        p = Parser.new(link, level, toc)
+        if is_archive(pwd):
+            _parse_archive(root, pwd, p, prof, source)
+        for name, path in package:
+            with phase(None if serial else prof, 'partials'):
+                partial = next(partials)
+            # Load its source or stub
+            if partial is None:
+                pure_py = _parse(name, path, p, prof, source)
+            else:
+                sub, pure_py = partial
+                with phase(prof, 'merge'):
+                    p.merge(sub)
+            if not pure_py:
+                extensions.append((p, name, path, p.module_names(name)))
+        parsers.append(p)
+    # Shut down the workers
+    for _ in partials if not serial else ():
+        pass
+    with phase(prof, 'extension'):
+        _load_extensions(extensions, jobs=jobs, timeout=ext_timeout,
+                         cache=cache)
+    for p in parsers:
+        c = p.resolve_cache
+        logger.debug("resolve cache: %s hit, %s miss", c.hit, c.miss)
+        if prof is not None:
+            prof.count(p)
+    return parsers
+
+
+def _load(root: str, pwd: str, link: bool, level: int, toc: bool, *,
+          jobs: int = 1, cache: Optional[Cache] = None,
+          ext_timeout: float = EXT_TIMEOUT, source: str = SOURCE,
+          prof: Optional[Profiler] = None) -> Parser:
+    """Load the package into a parser, see `loader`."""
+    p, = _load_roots([(root, pwd)], link, level, toc, jobs=jobs, cache=cache,
+                     ext_timeout=ext_timeout, source=source, prof=prof)
+    return p
+
+
+def loader(root: str, pwd: str, link: bool, level: int, toc: bool, *,
+           jobs: int = 1, cache: Optional[Cache] = None,
+           ext_timeout: float = EXT_TIMEOUT, source: str = SOURCE,
+           prof: Optional[Profiler] = None) -> str:
+    """Package searching algorithm.
+
+    Parse the modules in `jobs` processes if it is not 1,
+    zero or negative value means using all processors.
+    The unchanged modules are loaded from `cache` if provided.
+    The extension modules are imported in the worker processes,
+    and each of them is terminated after `ext_timeout` seconds.
+    The phases are timed by the profiler `prof` if provided.
+
+    If a module has both source and stub in the same directory,
+    they are chosen by the `source` policy:
+    + "stub-first" (default): only the stub is parsed.
+    + "source-first": only the source is parsed.
+    + "merge": the stub is parsed, and the missing docstrings are filled
+      from the source without parsing it fully, including the names
+      imported by the source.
+    The stub packages (`name-stubs`) are always parsed after the source.
+    """
+    p = _load(root, pwd, link, level, toc, jobs=jobs, cache=cache,
+              ext_timeout=ext_timeout, source=source, prof=prof)
+    with phase(prof, 'compile'):
+        return p.compile()
+
+
+def _compile_alone(p: Parser) -> tuple[str, Warnings]:
+    """Compile the parser and return its warnings, for the worker processes.
+    """
+    return p.compile(), p.warnings
+
+
+def _compile_captured(
+    p: Parser
+) -> tuple[tuple[str, Warnings], list[LogRecord]]:
+    """Compile the parser, and capture the log records."""
+    return _captured(_compile_alone, p)
+
+
+def _compile_roots(parsers: Sequence[Parser], jobs: int) -> Iterator[str]:
+    """Compile the parsers in order, in `jobs` processes if it is not 1.
+
+    The warnings of the workers are copied back to the parsers.
+    """
+    if jobs == 1 or len(parsers) < 2:
+        for p in parsers:
+            yield p.compile()
+        return
+    jobs = min(jobs if jobs > 0 else cpu_count() or 1, len(parsers))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(jobs, initializer=set_level,
+                             initargs=(logger.level,)) as executor:
+        for p, result in zip(parsers,
+                             executor.map(_compile_captured, parsers)):
+            doc, p.warnings = _replay(result)
+            yield doc
+
+
+def _render_alone(
+    link: bool,
+    level: int,
+    modules: dict[str, _Keys],
+    sections: _Sections
+) -> dict[str, list[str]]:
+    """Render the sections of the modules from the keys,
+    for the worker processes.
+
+    Only the texts are returned, the keys are known by the caller.
+    """
+    _, rendered = Parser.new(link, level, False).render_modules(modules,
+                                                                sections)
+    return {root: [rendered[name][1] for name, _ in keys]
+            for root, keys in modules.items()}
+
+
+def _render_captured(
+    link: bool,
+    level: int,
+    modules: dict[str, _Keys],
+    sections: _Sections
+) -> tuple[dict[str, list[str]], list[LogRecord]]:
+    """Render the sections of the modules, and capture the log records."""
+    return _captured(_render_alone, link, level, modules, sections)
+
+
+def _compile_split_roots(
+    names: Sequence[str],
+    parsers: Sequence[Parser],
+    jobs: int
+) -> Iterator[tuple[str, dict[str, str]]]:
+    """Compile the index and the module documents of the parsers in order.
+
+    If `jobs` is not 1, the aliases are substituted in this process, then
+    the modules of each parser are split into `jobs` parts, the first part
+    is rendered in this process, and the other parts are rendered in the
+    worker processes, which only receive the keys and the reusable
+    sections of their modules.
+    """
+    n = jobs if jobs > 0 else cpu_count() or 1
+    if n == 1:
+        for name, p in zip(names, parsers):
+            yield p.compile_split(_module_link(name))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(n - 1, initializer=set_level,
+                             initargs=(logger.level,)) as executor:
+        pending = []
+        for name, p in zip(names, parsers):
+            index, modules = p.split_keys(_module_link(name))
+            items = list(modules.items())
+            parts = [dict(items[i::n]) for i in range(n)]
+            futures = [executor.submit(
+                _render_captured, p.link, p.b_level, part,
+                {k: p.sections[k] for keys in part.values() for k, _ in keys
+                 if k in p.sections}) for part in parts[1:]]
+            pending.append((p, index, modules, parts[0], futures))
+        for p, index, modules, first, futures in pending:
+            docs, sections = p.render_modules(first)
+            for f in futures:
+                for root, texts in _replay(f.result()).items():
+                    keys = modules[root]
+                    # Same as the joined sections of `render_modules`
+                    docs[root] = "\n\n".join(texts) + '\n'
+                    sections.update((name, (key, text)) for (name, key), text
+                                    in zip(keys, texts))
+            p.sections = sections
+            yield index, {m: docs[m] for m in modules}
+
+
+def _report(parsers: Iterable[Parser], out: Optional[str] = None,
+            limit: Optional[int] = None) -> None:
+    """Log the summary of the warnings of the parsers,
+    and dump them to the file `out` if provided.
+
+    Raise `WarningLimitError` if the number of warnings exceeds `limit`.
+    """
+    w = Warnings.collect(p.warnings for p in parsers)
+    if w:
+        for line in w.summary().splitlines():
+            logger.warning(line)
+    if out is not None:
+        w.dump(out)
+        logger.info("Write warnings: %s", out)
+    if limit is not None and w.total() > limit:
+        raise WarningLimitError(f"{w.total()} warning(s) exceed the limit "
+                                f"of {limit}")
+
+
+def _doc_path(prefix: str, name: str) -> str:
+    """The output path of the package."""
+    return join(prefix, f"{name.replace('_', '-')}-api.md")
+
+
+def _split_dir(name: str) -> str:
+    """The output directory of the module documents of the package,
+    relative to the output path.
+    """
+    return f"{name.replace('_', '-')}-api"
+
+
+def _module_link(name: str) -> str:
+    """The link format of the module documents from the index of
+    the package.
+    """
+    return _split_dir(name) + "/{}.md"
+
+
+def _document(title: str, doc: str, level: int) -> str:
+    """Add the title to the document."""
+    return '#' * level + f" {title} API\n\n" + doc
+
+
+def _roots(root_names: dict[str, str]) -> list[tuple[str, str, str]]:
+    """The title, name and path of the packages.
+
+    The archives are replaced by their top-level packages,
+    which are titled by their names unless the only one is titled.
+    """
+    roots = []
+    for title, name in root_names.items():
+        if not is_archive(name):
+            roots.append((title, name, _site_path(name)))
+            continue
+        packages = archive_packages(name)
+        if not packages:
+            logger.warning("no package in '%s'", name)
+        for pkg in packages:
+            if title == name or len(packages) > 1:
+                roots.append((pkg, pkg, name))
+            else:
+                roots.append((title, pkg, name))
+    return roots
+
+
+def _write_split(prefix: str, name: str, index: str,
+                 docs: dict[str, str], dry: bool) -> tuple[list[str], int, int]:
+    """Write the index and the module documents of the package,
+    and remove the stale module documents.
+
+    Return the paths, the number of written files and unchanged files.
+    """
+    folder = join(prefix, _split_dir(name))
+    files = {_doc_path(prefix, name): index}
+    files.update((join(folder, m + '.md'), doc) for m, doc in docs.items())
+    if dry:
+        for path, doc in files.items():
+            logger.info("Write file: %s", path)
+            logger.info('=' * 12)
+            logger.info(doc)
+        return list(files), 0, 0
+    if not isdir(folder):
+        mkdir(folder)
+    written = skipped = 0
+    for path, doc in files.items():
+        if _write(path, doc):
+            logger.info("Write file: %s", path)
+            written += 1
+        else:
+            logger.debug("Unchanged file: %s", path)
+            skipped += 1
+    for entry in scandir(folder):
+        if entry.name.endswith('.md') and entry.path not in files:
+            remove(entry.path)
+            logger.info("Remove file: %s", entry.path)
+    return list(files), written, skipped
+
+
+def _write_search(prefix: str, titles: Sequence[tuple[str, str]],
+                  parsers: Sequence[Parser], split: bool,
+                  dry: bool) -> tuple[int, int]:
+    """Write the search index of the packages to the directory "search",
+    and remove the stale files, see `build_search`.
+
+    The names are linked to the documents relative to the output path.
+    Return the number of written files and unchanged files.
+    """
+    from .search import SEARCH_DIR, build_search
+    entries = chain.from_iterable(
+        p.search_entries(_module_link(name) if split
+                         else _split_dir(name) + ".md")
+        for (_, name), p in zip(titles, parsers))
+    folder = join(prefix, SEARCH_DIR)
+    files = {join(folder, f): doc for f, doc in build_search(entries).items()}
+    if dry:
+        for path in files:
+            logger.info("Write file: %s", path)
+        return 0, 0
+    if not isdir(folder):
+        mkdir(folder)
+    written = skipped = 0
+    for path, doc in files.items():
+        if _write(path, doc):
+            logger.debug("Write file: %s", path)
+            written += 1
+        else:
+            skipped += 1
+    for entry in scandir(folder):
+        if entry.name.endswith('.json') and entry.path not in files:
+            remove(entry.path)
+            logger.debug("Remove file: %s", entry.path)
+    logger.info("Write search index: %s (%s file(s) changed)",
+                folder, written)
+    return written, skipped
+
+
+def _output(
+    titles: Sequence[tuple[str, str]],
+    parsers: Sequence[Parser],
+    *,
+    prefix: str,
+    level: int,
+    dry: bool,
+    jobs: int,
+    stream: bool,
+    split: bool,
+    search: bool,
+    prof: Optional[Profiler]
+) -> tuple[list[str], int, int]:
+    """Compile and write the documents of the `(title, name)` packages,
+    and the search index if `search` is enabled.
+
+    Return the documents (or paths if streaming or splitting),
+    the number of written files and unchanged files.
+    """
+    docs = []
+    written = skipped = 0
+    compiled: Iterator[str] = (iter(()) if stream or split
+                               else _compile_roots(parsers, jobs))
+    split_docs: Iterator[tuple[str, dict[str, str]]] = (
+        _compile_split_roots([name for _, name in titles], parsers, jobs)
+        if split else iter(()))
+    for (title, name), p in zip(titles, parsers):
+        if split:
+            with phase(prof, 'compile'):
+                index, modules = next(split_docs)
+            if not modules:
+                logger.warning("'%s' can not be found", name)
+                continue
+            with phase(prof, 'write'):
+                paths, w, s = _write_split(prefix, name,
+                                           _document(title, index, level),
+                                           modules, dry)
+            written += w
+            skipped += s
+            docs.extend(paths)
             continue
-        logger.debug(f"loading extension module for fully documented:")
-        # Try to load module here
-        for ext in EXTENSION_SUFFIXES:
-            path_ext = path + ext
-            if not isfile(path_ext):
+        if stream:
+            with phase(prof, 'write'):
+                chunks = _nonblank(p.compile_iter())
+            if chunks is None:
+                logger.warning("'%s' can not be found", name)
                 continue
-            logger.debug(f"{name} <= {path_ext}")
-            if _load_module(name, path_ext, p):
-                break
+            chunks = chain([_document(title, "", level)], chunks)
+            path = _doc_path(prefix, name)
+            if dry:
+                logger.info("Write file: %s", path)
+                logger.info('=' * 12)
+                for chunk in chunks:
+                    logger.info(chunk)
+            else:
+                with phase(prof, 'write'):
+                    changed = _write_iter(path, chunks)
+                if changed:
+                    logger.info("Write file: %s", path)
+                    written += 1
+                else:
+                    logger.info("Unchanged file: %s", path)
+                    skipped += 1
+            docs.append(path)
+            continue
+        with phase(prof, 'compile'):
+            doc = next(compiled)
+        if not doc.strip():
+            logger.warning("'%s' can not be found", name)
+            continue
+        doc = _document(title, doc, level)
+        path = _doc_path(prefix, name)
+        if dry:
+            logger.info("Write file: %s", path)
+            logger.info('=' * 12)
+            logger.info(doc)
         else:
-            logger.warning(f"no module for {name} in this platform")
-    return p.compile()
+            with phase(prof, 'write'):
+                changed = _write(path, doc)
+            if changed:
+                logger.info("Write file: %s", path)
+                written += 1
+            else:
+                logger.info("Unchanged file: %s", path)
+                skipped += 1
+        docs.append(doc)
+    if search:
+        with phase(prof, 'search'):
+            w, s = _write_search(prefix, titles, parsers, split, dry)
+        written += w
+        skipped += s
+    return docs, written, skipped
 
 
 def gen_api(
@@ -114,32 +830,353 @@ def gen_api(
     link: bool = True,
     level: int = 1,
     toc: bool = False,
-    dry: bool = False
+    dry: bool = False,
+    jobs: int = 1,
+    cache: Optional[str] = None,
+    cache_size: int = CACHE_SIZE,
+    ext_timeout: float = EXT_TIMEOUT,
+    source: str = SOURCE,
+    stream: bool = False,
+    split: bool = False,
+    search: bool = False,
+    index: Optional[str] = None,
+    profile: bool = False,
+    profile_out: Optional[str] = None,
+    warnings_out: Optional[str] = None,
+    max_warnings: Optional[int] = None
 ) -> Sequence[str]:
     """Generate API. All rules are listed in the readme.
 
     The path `pwd` is the current path that provided to `pkgutil`,
     which allows the "site-packages" directory to be used.
+    The names of `root_names` can be the paths of wheels, sdists and
+    zip files, the packages are parsed from them without installation.
+    The modules are parsed in `jobs` processes, see `loader`.
+    The modules of all packages share the same workers,
+    and the documents are compiled in `jobs` processes either,
+    the results and the logs are still in the order of `root_names`.
+    The parsed modules are cached in the directory `cache` if provided,
+    the cache is limited to `cache_size` bytes.
+    The extension modules are loaded within `ext_timeout` seconds.
+    The source or stub of the modules are chosen by `source`, see `loader`.
+
+    If `stream` is enabled, the documents are written chunk by chunk
+    without keeping in memory, and the written paths are returned instead.
+    If `split` is enabled, each public module is written to its own file
+    in the directory "name-api", and the file "name-api.md" is the table
+    of contents linked to them. The modules are compiled in `jobs`
+    processes, the stale module files are removed, and the written paths
+    are returned. Streaming is not used when splitting.
+
+    If `search` is enabled, the search index of the public names is
+    written to the directory "search", see `build_search`.
+
+    The parsed packages are saved to the file `index` if provided,
+    which can be rendered by `render_index` without the sources,
+    see `save_index` for the format.
+
+    If `profile` is enabled, the time of each phase and module,
+    resolver cache and peak memory are reported.
+    The result is dumped to `profile_out` if provided,
+    as JSON for ".json" suffix, otherwise the `pstats` file of `cProfile`.
+
+    The warnings (such as missing documentation) are counted by name
+    and reported as a summary at the end, see `Warnings`.
+    They are dumped to `warnings_out` as JSON if provided,
+    and `WarningLimitError` is raised after the documents are written
+    if the number of warnings exceeds `max_warnings`.
     """
+    prof = None
+    stats = None
+    if profile or profile_out is not None:
+        prof = Profiler()
+        if profile_out is not None and not profile_out.endswith('.json'):
+            from cProfile import Profile
+            stats = Profile()
+            stats.enable()
     if pwd is not None:
         sys_path.append(pwd)
     if not isdir(prefix):
-        logger.info(f"Create directory: {prefix}")
+        logger.info("Create directory: %s", prefix)
         mkdir(prefix)
-    docs = []
+    c = None
+    if cache is not None:
+        c = Cache(cache, link=link, level=level, toc=toc, source=source,
+                  max_size=cache_size)
+    roots = _roots(root_names)
+    for title, name, _ in roots:
+        logger.info("Load root: %s (%s)", name, title)
+    parsers = _load_roots([(name, pwd) for _, name, pwd in roots],
+                          link, level, toc, jobs=jobs, cache=c,
+                          ext_timeout=ext_timeout, source=source, prof=prof)
+    titles = [(title, name) for title, name, _ in roots]
+    if index is not None:
+        from .index import save_index
+        with phase(prof, 'write'):
+            save_index(index, ((title, name, p) for (title, name), p
+                               in zip(titles, parsers)))
+        logger.info("Write index: %s", index)
+    docs, written, skipped = _output(
+        titles, parsers, prefix=prefix, level=level, dry=dry, jobs=jobs,
+        stream=stream, split=split, search=search, prof=prof)
+    if c is not None:
+        c.close()
+    if not dry:
+        logger.info("%s file(s) written, %s file(s) unchanged",
+                    written, skipped)
+    if prof is not None:
+        prof.stop()
+        for line in prof.report().splitlines():
+            logger.info(line)
+        if profile_out is not None:
+            if stats is None:
+                prof.dump(profile_out)
+            else:
+                stats.disable()
+                stats.dump_stats(profile_out)
+            logger.info("Write profile: %s", profile_out)
+    _report(parsers, warnings_out, max_warnings)
+    return docs
+
+
+def render_index(
+    index: str,
+    root_names: Optional[dict[str, str]] = None,
+    *,
+    prefix: str = 'docs',
+    link: bool = True,
+    level: int = 1,
+    toc: bool = False,
+    dry: bool = False,
+    jobs: int = 1,
+    stream: bool = False,
+    split: bool = False,
+    search: bool = False,
+    warnings_out: Optional[str] = None,
+    max_warnings: Optional[int] = None
+) -> Sequence[str]:
+    """Generate API from the file `index` saved by `gen_api`,
+    the source of the packages are not required.
+
+    All packages of the index are generated if `root_names` is not provided,
+    otherwise only the listed packages with the titles.
+    Other options are same as `gen_api`.
+    """
+    if not isdir(prefix):
+        logger.info("Create directory: %s", prefix)
+        mkdir(prefix)
+    from .index import load_index
+    logger.info("Load index: %s", index)
+    packages = {name: (title, p)
+                for title, name, p in load_index(index, link, level, toc)}
+    if root_names is None:
+        root_names = {title: name for name, (title, _) in packages.items()}
+    titles = []
+    parsers = []
     for title, name in root_names.items():
-        logger.info(f"Load root: {name} ({title})")
-        doc = loader(name, _site_path(name), link, level, toc)
-        if not doc.strip():
-            logger.warning(f"'{name}' can not be found")
+        if name not in packages:
+            logger.warning("'%s' can not be found in the index", name)
             continue
-        doc = '#' * level + f" {title} API\n\n" + doc
-        path = join(prefix, f"{name.replace('_', '-')}-api.md")
-        logger.info(f"Write file: {path}")
-        if dry:
-            logger.info('=' * 12)
-            logger.info(doc)
-        else:
-            _write(path, doc)
-        docs.append(doc)
+        titles.append((title, name))
+        parsers.append(packages[name][1])
+    docs, written, skipped = _output(
+        titles, parsers, prefix=prefix, level=level, dry=dry, jobs=jobs,
+        stream=stream, split=split, search=search, prof=None)
+    if not dry:
+        logger.info("%s file(s) written, %s file(s) unchanged",
+                    written, skipped)
+    _report(parsers, warnings_out, max_warnings)
     return docs
+
+
+def _stat(paths: Sequence[str]) -> _Stat:
+    """Size and modified time of the sources and stubs of the module."""
+    st = []
+    for path in paths:
+        for ext in (".py", ".pyi"):
+            try:
+                s = stat(path + ext)
+            except OSError:
+                continue
+            st.append((path + ext, s.st_size, s.st_mtime_ns))
+    return tuple(st)
+
+
+def _snapshot(root: str) -> _Snapshot:
+    """Find the modules of the package and their file status."""
+    modules: dict[str, list[str]] = {}
+    for name, path in walk_packages(root, _site_path(root), *_site_paths(root)):
+        modules.setdefault(name, []).append(path)
+    return {name: (paths, _stat(paths)) for name, paths in modules.items()}
+
+
+def _update(p: Parser, old: _Snapshot, new: _Snapshot, *, jobs: int = 1,
+            ext_timeout: float = EXT_TIMEOUT, source: str = SOURCE) -> bool:
+    """Update the changed modules, return true if any module is changed."""
+    changed = False
+    extensions = []
+    for name in sorted(old.keys() | new.keys()):
+        if name in old and name in new and old[name][1] == new[name][1]:
+            continue
+        changed = True
+        p.remove(name)
+        if name not in new:
+            logger.info("Removed: %s", name)
+            continue
+        logger.info("Changed: %s", name)
+        for path in new[name][0]:
+            if not _parse(name, path, p, source=source):
+                extensions.append((p, name, path, p.module_names(name)))
+    _load_extensions(extensions, jobs=jobs, timeout=ext_timeout)
+    return changed
+
+
+def _write_watched(prefix: str, title: str, name: str, p: Parser,
+                   old: str, level: int, split: bool) -> str:
+    """Write the documents of the watched package `name`,
+    return the written document, or `old` if unchanged.
+    """
+    if split:
+        index, modules = p.compile_split(_module_link(name))
+        if not modules:
+            logger.warning("'%s' can not be found", name)
+            return old
+        _write_split(prefix, name, _document(title, index, level),
+                     modules, False)
+        return old
+    doc = p.compile()
+    if not doc.strip():
+        logger.warning("'%s' can not be found", name)
+        return old
+    doc = _document(title, doc, level)
+    if doc == old:
+        return old
+    path = _doc_path(prefix, name)
+    if _write(path, doc):
+        logger.info("Write file: %s", path)
+    return doc
+
+
+def _settle(name: str, new: _Snapshot, debounce: float) -> _Snapshot:
+    """Wait for the burst of saves, return the last snapshot."""
+    while True:
+        sleep(debounce)
+        s = _snapshot(name)
+        if s == new:
+            return new
+        new = s
+
+
+def _watchable(root_names: dict[str, str]) -> dict[str, str]:
+    """Remove the archives which can not be watched."""
+    for name in root_names.values():
+        if is_archive(name):
+            logger.warning("archive '%s' can not be watched", name)
+    return {t: n for t, n in root_names.items() if not is_archive(n)}
+
+
+def _load_watched(
+    root_names: dict[str, str],
+    link: bool,
+    level: int,
+    toc: bool,
+    *,
+    jobs: int,
+    cache: Optional[str],
+    cache_size: int,
+    ext_timeout: float,
+    source: str
+) -> tuple[dict[str, Parser], dict[str, _Snapshot]]:
+    """Load the watched packages with their snapshots."""
+    c = None
+    if cache is not None:
+        c = Cache(cache, link=link, level=level, toc=toc, source=source,
+                  max_size=cache_size)
+    parsers = {}
+    snapshots = {}
+    for title, name in root_names.items():
+        logger.info("Load root: %s (%s)", name, title)
+        snapshots[name] = _snapshot(name)
+        parsers[name] = _load(name, _site_path(name), link, level, toc,
+                              jobs=jobs, cache=c, ext_timeout=ext_timeout,
+                              source=source)
+    if c is not None:
+        c.close()
+    return parsers, snapshots
+
+
+def _poll(root_names: dict[str, str], parsers: dict[str, Parser],
+          snapshots: dict[str, _Snapshot], *, debounce: float, jobs: int,
+          ext_timeout: float, source: str) -> list[tuple[str, str]]:
+    """Update the changed packages, return their titles and names."""
+    updated = []
+    for title, name in root_names.items():
+        new = _snapshot(name)
+        if new == snapshots[name]:
+            continue
+        new = _settle(name, new, debounce)
+        if _update(parsers[name], snapshots[name], new, jobs=jobs,
+                   ext_timeout=ext_timeout, source=source):
+            updated.append((title, name))
+        snapshots[name] = new
+    return updated
+
+
+def watch(
+    root_names: dict[str, str],
+    pwd: Optional[str] = None,
+    *,
+    prefix: str = 'docs',
+    link: bool = True,
+    level: int = 1,
+    toc: bool = False,
+    jobs: int = 1,
+    cache: Optional[str] = None,
+    cache_size: int = CACHE_SIZE,
+    ext_timeout: float = EXT_TIMEOUT,
+    source: str = SOURCE,
+    split: bool = False,
+    search: bool = False,
+    interval: float = 1.,
+    debounce: float = 0.5
+) -> None:
+    """Generate API, then watch the packages until interrupted.
+
+    The package directories are polled every `interval` seconds,
+    the changes are applied after no more changes in `debounce` seconds.
+    Only the changed modules are parsed again, and only the changed
+    documents are written. Other options are same as `gen_api`.
+    The warnings are summarized after each generation.
+    The archives can not be watched.
+    """
+    root_names = _watchable(root_names)
+    if pwd is not None:
+        sys_path.append(pwd)
+    if not isdir(prefix):
+        logger.info("Create directory: %s", prefix)
+        mkdir(prefix)
+    parsers, snapshots = _load_watched(
+        root_names, link, level, toc, jobs=jobs, cache=cache,
+        cache_size=cache_size, ext_timeout=ext_timeout, source=source)
+    docs = dict.fromkeys(root_names.values(), "")
+    updated = list(root_names.items())
+    try:
+        while True:
+            for title, name in updated:
+                docs[name] = _write_watched(prefix, title, name,
+                                            parsers[name], docs[name],
+                                            level, split)
+            if search:
+                _write_search(prefix, list(root_names.items()),
+                              [parsers[n] for n in root_names.values()],
+                              split, False)
+            _report(parsers.values())
+            logger.info("Watching for changes...")
+            updated = []
+            while not updated:
+                sleep(interval)
+                updated = _poll(root_names, parsers, snapshots,
+                                debounce=debounce, jobs=jobs,
+                                ext_timeout=ext_timeout, source=source)
+    except KeyboardInterrupt:
+        logger.info("Stop watching")
@@ -1,18 +1,37 @@
 # -*- coding: utf-8 -*-
 
-"""Logger creation."""
+"""Logger creation.
 
-__all__ = ['logger']
+The messages are colored by `colorlog` if it is installed
+and the output is a terminal.
+"""
+
+__all__ = ['logger', 'set_level']
 __author__ = "Yuan Chang"
 __copyright__ = "Copyright (C) 2020-2021"
 __license__ = "MIT"
 __email__ = "pyslvs@gmail.com"
 
-from logging import DEBUG
-from colorlog import getLogger, StreamHandler, ColoredFormatter
+from sys import stderr
+from logging import INFO, Formatter, StreamHandler, getLogger
+
+_FORMAT = "%(message)s"
 
+logger = getLogger('apimd')
+logger.setLevel(INFO)
+logger.propagate = False
 handler = StreamHandler()
-handler.setFormatter(ColoredFormatter("%(log_color)s%(message)s"))
-logger = getLogger()
-logger.setLevel(DEBUG)
+handler.setFormatter(Formatter(_FORMAT))
+if stderr is not None and stderr.isatty():
+    try:
+        from colorlog import ColoredFormatter
+    except ImportError:
+        pass
+    else:
+        handler.setFormatter(ColoredFormatter("%(log_color)s" + _FORMAT))
 logger.addHandler(handler)
+
+
+def set_level(level: int) -> None:
+    """Set the level of the logger, also the initializer of the workers."""
+    logger.setLevel(level)
@@ -7,24 +7,33 @@ __copyright__ = "Copyright (C) 2020-2021"
 __license__ = "MIT"
 __email__ = "pyslvs@gmail.com"
 
-from typing import cast, TypeVar, Union, Optional
+from typing import TypeVar, Union, Optional, NamedTuple, Any, cast
+from sys import intern
 from types import ModuleType
-from collections.abc import Sequence, Iterable, Iterator
+from collections.abc import (
+    Sequence, Iterable, Iterator, Container, Callable, MutableMapping,
+)
 from itertools import chain
-from dataclasses import dataclass, field
+from functools import lru_cache
+from copy import copy
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field, replace
 from inspect import getdoc
 from ast import (
     parse, unparse, get_docstring, AST, FunctionDef, AsyncFunctionDef, ClassDef,
     Assign, AnnAssign, Delete, Import, ImportFrom, Name, Expr, Subscript, BinOp,
     BitOr, Call, If, Try, Tuple, List, Set, Dict, Constant, Load, Attribute,
-    arg, expr, stmt, arguments, NodeTransformer,
+    Module, arg, expr, stmt, arguments, NodeTransformer, iter_fields,
 )
-from .logger import logger
 from .pep585 import PEP585
+from .diagnostics import Warnings
 
+_V = TypeVar('_V')
 _I = Union[Import, ImportFrom]
 _G = Union[Assign, AnnAssign]
 _API = Union[FunctionDef, AsyncFunctionDef, ClassDef]
+_Sections = dict[str, tuple[tuple['Entry', str, str], str]]
+_Keys = list[tuple[str, tuple['Entry', str, str]]]
 ANY = 'Any'
 
 
@@ -43,9 +52,36 @@ def _attr(obj: object, attr: str) -> object:
     return n
 
 
-def _defaults(args: Sequence[Optional[expr]]) -> Iterator[str]:
-    """Literals of the table."""
-    yield from (code(unparse(a)) if a is not None else " " for a in args)
+def _prefixes(name: str) -> Iterator[str]:
+    """The name and its parents."""
+    i = len(name)
+    while i > 0:
+        yield name[:i]
+        i = name.rfind('.', 0, i)
+
+
+def _insort(a: list[str], x: str, key: Callable[[str], Any]) -> None:
+    """Insert the item into the list sorted by the key."""
+    k = key(x)
+    lo, hi = 0, len(a)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key(a[mid]) < k:
+            lo = mid + 1
+        else:
+            hi = mid
+    a.insert(lo, x)
+
+
+def docstrings(root: str, m: ModuleType,
+               names: Iterable[str]) -> dict[str, str]:
+    """Get the docstrings of the names from the module."""
+    docs = {}
+    for name in names:
+        doc = getdoc(_attr(m, name.removeprefix(root + '.')))
+        if doc is not None:
+            docs[name] = doc
+    return docs
 
 
 def parent(name: str, *, level: int = 1) -> str:
@@ -59,18 +95,37 @@ def is_magic(name: str) -> bool:
     return name[:2] == name[-2:] == '__'
 
 
+@lru_cache(maxsize=None)
 def is_public_family(name: str) -> bool:
     """Check the name is come from public modules or not."""
     for n in name.split('.'):
-        # Magic name
-        if is_magic(n):
-            continue
-        # Local or private name
-        if n.startswith('_'):
+        # Local or private name, except magic name
+        if n.startswith('_') and not is_magic(n):
             return False
     return True
 
 
+def _count_parents(parents: dict[str, int], name: str, n: int) -> list[str]:
+    """Add `n` to the counts of the public members of the parents,
+    return the parents which have no public member before or after.
+    """
+    crossed: list[str] = []
+    if not n or not is_public_family(name):
+        return crossed
+    i = name.rfind('.')
+    while i > 0:
+        h = name[:i]
+        c = parents.get(h, 0) + n
+        if c:
+            parents[h] = c
+        else:
+            del parents[h]
+        if c == 0 or c == n:
+            crossed.append(h)
+        i = name.rfind('.', 0, i)
+    return crossed
+
+
 def walk_body(body: Sequence[stmt]) -> Iterator[stmt]:
     """Traverse around body and its simple definition scope."""
     for node in body:
@@ -87,6 +142,39 @@ def walk_body(body: Sequence[stmt]) -> Iterator[stmt]:
             yield node
 
 
+def walk_scope(body: Sequence[stmt]) -> tuple[list[stmt], list[_API]]:
+    """Traverse around body once, split the definitions of functions and
+    classes from the other statements.
+    """
+    stmts = []
+    apis = []
+    for node in walk_body(body):
+        if isinstance(node, (FunctionDef, AsyncFunctionDef, ClassDef)):
+            apis.append(node)
+        else:
+            stmts.append(node)
+    return stmts, apis
+
+
+def _docstrings(root: str, node: Union[Module, _API],
+                prefix: str = '') -> Iterator[tuple[str, str]]:
+    """Docstrings of the module, functions and classes with their full names,
+    the names are same as `Parser.api`.
+    """
+    if isinstance(node, Module):
+        name = root
+    else:
+        name = _m(root, prefix, node.name)
+    doc = get_docstring(node)
+    if doc is not None:
+        yield name, doc
+    if isinstance(node, (FunctionDef, AsyncFunctionDef)):
+        return
+    prefix = '' if isinstance(node, Module) else node.name
+    for e in walk_scope(node.body)[1]:
+        yield from _docstrings(root, e, prefix)
+
+
 def code(doc: str) -> str:
     """Escape Markdown charters from inline code."""
     doc = doc.replace('|', '&#124;')
@@ -195,26 +283,303 @@ def const_type(node: expr) -> str:
     return ANY
 
 
+def _parse_expr(source: str, exprs: dict[str, Optional[expr]]) -> expr:
+    """Parse an expression with the cache `exprs`.
+
+    Raise `SyntaxError` if the source is not an expression.
+    """
+    if source not in exprs:
+        try:
+            e = parse(source).body[0]
+        except (SyntaxError, IndexError):
+            exprs[source] = None
+        else:
+            exprs[source] = e.value if isinstance(e, Expr) else None
+    e = exprs[source]
+    if e is None:
+        raise SyntaxError(f"invalid expression: {source}")
+    return e
+
+
+class Entry(NamedTuple):
+    """Intermediate representation of a module, function or class.
+
+    The entries are rendered into Markdown only if they are public.
+    The annotations are resolved but not escaped.
+    """
+    kind: str
+    name: str = ""
+    nested: bool = False
+    decorators: tuple[str, ...] = ()
+    args: tuple[str, ...] = ()
+    annotations: tuple[str, ...] = ()
+    defaults: tuple[str, ...] = ()
+    bases: tuple[str, ...] = ()
+    enums: tuple[str, ...] = ()
+    members: tuple[tuple[str, str], ...] = ()
+
+
+@dataclass(repr=False)
+class ResolveCache:
+    """Memoization of annotation resolution.
+
+    The results are keyed by root module, annotation source and self type,
+    and each result keeps the deprecated names found in the annotation.
+    The parsed expressions of alias values and strings are shared.
+    """
+    result: dict[str, dict[tuple[str, str], tuple[str, tuple[str, ...]]]] = (
+        field(default_factory=dict))
+    expr: dict[str, Optional[expr]] = field(default_factory=dict)
+    hit: int = 0
+    miss: int = 0
+
+    def invalidate(self, root: Optional[str] = None) -> None:
+        """Drop the results of the root module, or all if not specified."""
+        if root is None:
+            self.result.clear()
+        else:
+            self.result.pop(root, None)
+
+
+@dataclass(repr=False)
+class AliasView:
+    """Alias substitution and public names kept between compiles.
+
+    The parser after alias substitution writes into overlays of the parser,
+    then only the names related to the changed modules are substituted
+    and checked again. The view is dropped if too many names are changed.
+    """
+    parser: Optional['Parser'] = None
+    dirty: set[str] = field(default_factory=set)
+    roots: set[str] = field(default_factory=set)
+    lex: list[str] = field(default_factory=list)
+    moves: dict[str, list[tuple[str, str]]] = field(default_factory=dict)
+    targets: dict[str, list[str]] = field(default_factory=dict)
+    alias: dict[str, str] = field(default_factory=dict)
+    imp: dict[str, frozenset[str]] = field(default_factory=dict)
+    filled: dict[str, str] = field(default_factory=dict)
+    parents: dict[str, int] = field(default_factory=dict)
+    order: list[str] = field(default_factory=list)
+    consts: dict[str, list[str]] = field(default_factory=dict)
+    const: dict[str, str] = field(default_factory=dict)
+    keys: dict[str, tuple[Entry, str, str]] = field(default_factory=dict)
+    undocumented: dict[str, str] = field(default_factory=dict)
+
+    def invalidate(self, root: Optional[str] = None) -> None:
+        """Mark the names defined by the root module as changed,
+        or drop the view if not specified.
+        """
+        if root is None:
+            self.parser = None
+        elif self.parser is not None:
+            self.roots.add(root)
+
+    def invalidate_names(self, names: Iterable[str]) -> None:
+        """Mark the names as changed."""
+        if self.parser is not None:
+            self.dirty.update(names)
+
+    def __readers(self, alias: dict[str, str], name: str) -> Iterator[str]:
+        """The aliases which read or write the family of the name."""
+        for h in _prefixes(name):
+            yield from self.targets.get(h, ())
+            if h in alias or h in self.alias:
+                yield h
+
+    def related(self, alias: dict[str, str],
+                dirty: Iterable[str]) -> tuple[set[str], set[str]]:
+        """The names and the aliases related to the changed names.
+
+        The aliases which read or write the family of a related name are
+        related, and so are the names moved by the related aliases.
+        """
+        seen: set[str] = set()
+        affected: set[str] = set()
+        work = list(dirty)
+        while work:
+            s = work.pop()
+            if s in seen:
+                continue
+            seen.add(s)
+            for n in self.__readers(alias, s):
+                if n not in affected:
+                    affected.add(n)
+                    for ch, nw in self.moves.get(n, ()):
+                        work.extend((ch, nw))
+        return seen, affected
+
+    def is_related(self, alias: dict[str, str], name: str,
+                   affected: set[str]) -> bool:
+        """Return true if the name is read or written by the aliases
+        other than the affected aliases.
+        """
+        return any(n not in affected for n in self.__readers(alias, name))
+
+    def reindex(self, alias: dict[str, str], names: Iterable[str]) -> None:
+        """Update the targets of the aliases."""
+        for n in names:
+            a = self.alias.pop(n, None)
+            if a is not None:
+                self.targets[a].remove(n)
+                if not self.targets[a]:
+                    del self.targets[a]
+            a = alias.get(n)
+            if a is not None:
+                self.alias[n] = a
+                self.targets.setdefault(a, []).append(n)
+
+    def reset(self, names: Iterable[str]) -> dict[str, tuple[bool, bool, str]]:
+        """Drop the substitution of the names, return their old states
+        (in documents, in constants and root of the constants).
+        """
+        assert self.parser is not None
+        p = self.parser
+        old = {}
+        for name in names:
+            # The overlays are changed with the parser already
+            i = bisect_left(self.lex, name)
+            in_doc = i < len(self.lex) and self.lex[i] == name
+            if in_doc:
+                del self.lex[i]
+            old[name] = (in_doc, name in self.const, self.const.get(name, ""))
+            for o in (p.doc, p.docstring, p.root, p.const):
+                cast(_Overlay[Any], o).reset(name)
+        return old
+
+    def update_imp(self, imp: dict[str, set[str]]) -> list[str]:
+        """Update the `__all__` names of the changed modules,
+        return the modules which are changed.
+        """
+        changed = []
+        for root in self.roots:
+            a = imp.get(root)
+            if a == self.imp.get(root):
+                continue
+            if a is None:
+                del self.imp[root]
+            else:
+                self.imp[root] = frozenset(a)
+            changed.append(root)
+        return changed
+
+
+class _Overlay(MutableMapping[str, _V]):
+    """The changes over a dictionary without copying it.
+
+    The order of the keys is same as changing a copy of the dictionary.
+    """
+
+    def __init__(self, base: dict[str, _V]):
+        """Wrap the base dictionary, which is never modified."""
+        self.base = base
+        self.changed: dict[str, _V] = {}
+        self.added: dict[str, _V] = {}
+        self.deleted: set[str] = set()
+
+    def __getitem__(self, key: str) -> _V:
+        if key in self.added:
+            return self.added[key]
+        if key in self.deleted:
+            raise KeyError(key)
+        if key in self.changed:
+            return self.changed[key]
+        return self.base[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Same as `dict.get`."""
+        if key in self.added:
+            return self.added[key]
+        if key in self.deleted:
+            return default
+        if key in self.changed:
+            return self.changed[key]
+        return self.base.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.added or (key in self.base
+                                     and key not in self.deleted)
+
+    def __setitem__(self, key: str, value: _V) -> None:
+        if key in self.base and key not in self.deleted:
+            self.changed[key] = value
+        else:
+            self.added[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.added:
+            del self.added[key]
+        elif key in self.base and key not in self.deleted:
+            self.deleted.add(key)
+            self.changed.pop(key, None)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.base:
+            if key not in self.deleted:
+                yield key
+        yield from self.added
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.deleted) + len(self.added)
+
+    def reset(self, key: str) -> None:
+        """Drop the changes of the key."""
+        self.changed.pop(key, None)
+        self.added.pop(key, None)
+        self.deleted.discard(key)
+
+
 class Resolver(NodeTransformer):
-    """Annotation resolver."""
+    """Annotation resolver.
+
+    The visited nodes are never modified, the changed nodes are copied.
+    The deprecated names are listed in `deprecated`.
+    """
+
+    def __init__(self, root: str, alias: dict[str, str], self_ty: str = "",
+                 exprs: Optional[dict[str, Optional[expr]]] = None):
+        """Set root module, alias and generic self name.
 
-    def __init__(self, root: str, alias: dict[str, str], self_ty: str = ""):
-        """Set root module, alias and generic self name."""
+        The parsed expressions are cached in `exprs` if provided.
+        """
         super(Resolver, self).__init__()
         self.root = root
         self.alias = alias
         self.self_ty = self_ty
+        self.exprs = {} if exprs is None else exprs
+        self.deprecated: list[str] = []
+
+    def generic_visit(self, node: AST) -> AST:
+        """Visit the children and copy the node if any child is changed."""
+        changed: dict[str, object] = {}
+        for name, old in iter_fields(node):
+            if isinstance(old, list):
+                new = [self.visit(v) if isinstance(v, AST) else v
+                       for v in old]
+                if any(a is not b for a, b in zip(old, new)):
+                    changed[name] = new
+            elif isinstance(old, AST):
+                n = self.visit(old)
+                if n is not old:
+                    changed[name] = n
+        if not changed:
+            return node
+        node = copy(node)
+        for name, n in changed.items():
+            setattr(node, name, n)
+        return node
 
     def visit_Constant(self, node: Constant) -> AST:
         """Check string is a name."""
         if not isinstance(node.value, str):
             return node
         try:
-            e = cast(Expr, parse(node.value).body[0])
+            e = _parse_expr(node.value, self.exprs)
         except SyntaxError:
             return node
         else:
-            return self.visit(e.value)
+            return self.visit(e)
 
     def visit_Name(self, node: Name) -> AST:
         """Replace global names with its expression recursively."""
@@ -222,14 +587,14 @@ class Resolver(NodeTransformer):
             return Name("Self", Load())
         name = _m(self.root, node.id)
         if name in self.alias and name not in self.alias[name]:
-            e = cast(Expr, parse(self.alias[name]).body[0])
+            e = _parse_expr(self.alias[name], self.exprs)
             # Support `TypeVar`
-            if isinstance(e.value, Call) and isinstance(e.value.func, Name):
-                func_name = e.value.func.id
+            if isinstance(e, Call) and isinstance(e.func, Name):
+                func_name = e.func.id
                 idf = self.alias.get(_m(self.root, func_name), func_name)
                 if idf == 'typing.TypeVar':
                     return node
-            return self.visit(e.value)
+            return self.visit(e)
         else:
             return node
 
@@ -249,9 +614,7 @@ class Resolver(NodeTransformer):
         elif idf == 'typing.Optional':
             return BinOp(node.slice, BitOr(), Constant(None))
         elif idf in PEP585:
-            logger.warning(f"{node.lineno}:{node.col_offset}: "
-                           f"find deprecated name {idf}, "
-                           f"recommended to use {PEP585[idf]}")
+            self.deprecated.append(idf)
             return Subscript(Name(PEP585[idf], Load), node.slice, node.ctx)
         else:
             return node
@@ -282,13 +645,22 @@ class Parser:
     link: bool = True
     b_level: int = 1
     toc: bool = False
-    level: dict[str, int] = field(default_factory=dict)
-    doc: dict[str, str] = field(default_factory=dict)
+    doc: dict[str, Entry] = field(default_factory=dict)
     docstring: dict[str, str] = field(default_factory=dict)
     imp: dict[str, set[str]] = field(default_factory=dict)
     root: dict[str, str] = field(default_factory=dict)
     alias: dict[str, str] = field(default_factory=dict)
     const: dict[str, str] = field(default_factory=dict)
+    defs: dict[str, set[str]] = field(default_factory=dict)
+    doc_alias: dict[str, str] = field(default_factory=dict)
+    warnings: Warnings = field(default_factory=Warnings, repr=False,
+                               compare=False)
+    resolve_cache: ResolveCache = field(default_factory=ResolveCache,
+                                        init=False, compare=False)
+    sections: _Sections = field(default_factory=dict, init=False,
+                                repr=False, compare=False)
+    alias_view: AliasView = field(default_factory=AliasView, init=False,
+                                  repr=False, compare=False)
     _Self = TypeVar('_Self', bound='Parser')
 
     @classmethod
@@ -300,17 +672,29 @@ class Parser:
         if self.toc:
             self.link = True
 
+    def __getstate__(self) -> dict[str, object]:
+        """Pickle the parser without the memoization."""
+        state = self.__dict__.copy()
+        c = self.resolve_cache
+        state['resolve_cache'] = ResolveCache(hit=c.hit, miss=c.miss)
+        state['sections'] = {}
+        state['alias_view'] = AliasView()
+        return state
+
     def parse(self, root: str, script: str) -> None:
         """Main parser of the entire module."""
-        self.doc[root] = '#' * self.b_level + "# Module `{}`"
-        if self.link:
-            self.doc[root] += "\n<a id=\"{}\"></a>"
-        self.doc[root] += '\n\n'
-        self.level[root] = root.count('.')
+        self.parse_tree(root, parse(script, type_comments=True))
+
+    def parse_tree(self, root: str, root_node: Module) -> None:
+        """Parse the syntax tree of the entire module."""
+        root = intern(root)
+        self.alias_view.invalidate(root)
+        self.doc[root] = Entry('module')
         self.imp[root] = set()
         self.root[root] = root
-        root_node = parse(script, type_comments=True)
-        for node in walk_body(root_node.body):
+        self.defs.setdefault(root, set()).add(root)
+        stmts, apis = walk_scope(root_node.body)
+        for node in stmts:
             # "Execute" assignments
             if isinstance(node, (Import, ImportFrom)):
                 self.imports(root, node)
@@ -319,24 +703,114 @@ class Parser:
         doc = get_docstring(root_node)
         if doc is not None:
             self.docstring[root] = doctest(doc)
-        for node in walk_body(root_node.body):
-            if isinstance(node, (FunctionDef, AsyncFunctionDef, ClassDef)):
-                self.api(root, node)
+        # The annotations are resolved after all aliases are collected
+        for node in apis:
+            self.api(root, node)
+
+    def fill_docstring(self, root: str, script: str) -> None:
+        """Fill the missing docstrings from the source of the module."""
+        self.fill_docstring_tree(root, parse(script, type_comments=True))
+
+    def fill_docstring_tree(self, root: str, root_node: Module) -> None:
+        """Fill the missing docstrings from the syntax tree of the module,
+        the names which are not parsed are ignored.
+
+        The names imported by the module take the docstrings of their
+        origins when compiling, such as the re-exported functions.
+        """
+        self.alias_view.invalidate(root)
+        for name, doc in _docstrings(root, root_node):
+            if name in self.doc and name not in self.docstring:
+                self.docstring[name] = doctest(doc)
+        for node in walk_scope(root_node.body)[0]:
+            if isinstance(node, Import):
+                names = [(a.asname or a.name, a.name) for a in node.names]
+            elif isinstance(node, ImportFrom) and node.module is not None:
+                m = parent(root, level=node.level - 1) if node.level else ''
+                names = [(a.asname or a.name, _m(m, node.module, a.name))
+                         for a in node.names]
+            else:
+                continue
+            for name, origin in names:
+                name = _m(root, name)
+                if (
+                    name != origin
+                    and name in self.doc
+                    and name not in self.docstring
+                ):
+                    self.doc_alias[name] = origin
+                    self.defs[root].add(name)
+
+    def merge(self, p: 'Parser') -> None:
+        """Merge the state of another parser,
+        as if its modules were parsed by this parser afterwards.
+
+        The modules of the two parsers should be independent.
+        """
+        self.doc.update(p.doc)
+        self.docstring.update(p.docstring)
+        self.imp.update(p.imp)
+        self.root.update(p.root)
+        self.alias.update(p.alias)
+        self.doc_alias.update(p.doc_alias)
+        for root, names in p.defs.items():
+            self.defs.setdefault(root, set()).update(names)
+        for name, ann in p.const.items():
+            if self.const.get(name, ANY) == ANY:
+                self.const[name] = ann
+        self.warnings.update(p.warnings)
+        self.resolve_cache.invalidate()
+        self.alias_view.invalidate()
+        self.resolve_cache.hit += p.resolve_cache.hit
+        self.resolve_cache.miss += p.resolve_cache.miss
+
+    def remove(self, root: str) -> None:
+        """Remove the names defined by the module."""
+        names = self.defs.pop(root, set())
+        self.alias_view.invalidate_names(names)
+        self.alias_view.invalidate(root)
+        for name in names:
+            if self.root.get(name) == root:
+                self.doc.pop(name, None)
+                self.docstring.pop(name, None)
+                self.root.pop(name)
+                self.const.pop(name, None)
+            self.alias.pop(name, None)
+            self.doc_alias.pop(name, None)
+        self.imp.pop(root, None)
+        self.warnings.remove(root)
+        self.resolve_cache.invalidate(root)
+
+    def update(self, root: str, *scripts: str) -> None:
+        """Parse the module again from its source and stub,
+        the names defined by the old one are removed.
+
+        Only the changed sections are rendered by the next `compile`,
+        and only the aliases and the public names related to the module
+        are checked again, see `benchmarks/bench_update.py`.
+        """
+        self.remove(root)
+        for script in scripts:
+            self.parse(root, script)
 
     def imports(self, root: str, node: _I) -> None:
         """Save import names."""
         if isinstance(node, Import):
             for a in node.names:
-                name = a.name if a.asname is None else a.asname
-                self.alias[_m(root, name)] = a.name
+                name = _m(root, a.name if a.asname is None else a.asname)
+                self.alias[name] = a.name
+                self.defs[root].add(name)
         elif node.module is not None:
             if node.level:
                 m = parent(root, level=node.level - 1)
             else:
                 m = ''
             for a in node.names:
-                name = a.name if a.asname is None else a.asname
-                self.alias[_m(root, name)] = _m(m, node.module, a.name)
+                name = _m(root, a.name if a.asname is None else a.asname)
+                self.alias[name] = _m(m, node.module, a.name)
+                self.defs[root].add(name)
+        self.resolve_cache.invalidate(root)
+        self.alias_view.invalidate(root)
 
     def globals(self, root: str, node: _G) -> None:
         """Set up globals:
@@ -368,6 +842,9 @@ class Parser:
             return
         name = _m(root, left.id)
         self.alias[name] = expression
+        self.defs[root].add(name)
+        self.resolve_cache.invalidate(root)
+        self.alias_view.invalidate(root)
         if left.id.isupper():
             self.root[name] = root
             if self.const.get(name, ANY) == ANY:
@@ -382,43 +859,38 @@ class Parser:
         """Create API doc for only functions and classes.
         Where `name` is the full name.
         """
-        level = '#' * (self.b_level + (2 if not prefix else 3))
-        name = _m(root, prefix, node.name)
-        self.level[name] = self.level[root]
+        name = intern(_m(root, prefix, node.name))
+        self.alias_view.invalidate(root)
         self.root[name] = root
-        shirt_name = esc_underscore(_m(prefix, node.name))
+        self.defs[root].add(name)
         if isinstance(node, FunctionDef):
-            self.doc[name] = f"{level} {shirt_name}()\n\n"
+            kind = 'def'
         elif isinstance(node, AsyncFunctionDef):
-            self.doc[name] = f"{level} async {shirt_name}()\n\n"
+            kind = 'async def'
         else:
-            self.doc[name] = f"{level} class {shirt_name}\n\n"
-        self.doc[name] += "*Full name:* `{}`"
-        if self.link:
-            self.doc[name] += "\n<a id=\"{}\"></a>"
-        self.doc[name] += '\n\n'
-        decs = ['@' + self.resolve(root, d) for d in node.decorator_list]
-        if decs:
-            self.doc[name] += table("Decorators", items=map(code, decs))
+            kind = 'class'
+        decs = tuple(intern('@' + self.resolve(root, d))
+                     for d in node.decorator_list)
+        self.doc[name] = Entry(kind, _m(prefix, node.name), bool(prefix), decs)
+        apis: list[_API] = []
         if isinstance(node, (FunctionDef, AsyncFunctionDef)):
             self.func_api(root, name, node.args, node.returns,
                           has_self=bool(prefix) and '@staticmethod' not in decs,
                           cls_method='@classmethod' in decs)
         else:
-            self.class_api(root, name, node.bases, node.body)
+            members, apis = walk_scope(node.body)
+            self.class_api(root, name, node.bases, members)
         doc = get_docstring(node)
         if doc is not None:
             self.docstring[name] = doctest(doc)
-        if not isinstance(node, ClassDef):
-            return
-        for e in walk_body(node.body):
-            if isinstance(e, (FunctionDef, AsyncFunctionDef, ClassDef)):
-                self.api(root, e, prefix=node.name)
+        for e in apis:
+            self.api(root, e, prefix=node.name)
 
     def func_api(self, root: str, name: str, node: arguments,
                  returns: Optional[expr], *,
                  has_self: bool, cls_method: bool) -> None:
         """Create function API."""
+        self.alias_view.invalidate(root)
         args = []
         default: list[Optional[expr]] = []
         if node.posonlyargs:
@@ -441,23 +913,28 @@ class Parser:
             default.append(None)
         args.append(arg('return', returns))
         default.append(None)
-        ann = map(code, self.func_ann(root, args, has_self=has_self,
-                                      cls_method=cls_method))
+        ann = self.func_ann(root, args, has_self=has_self,
+                            cls_method=cls_method)
         has_default = all(d is None for d in default)
-        self.doc[name] += table(
-            *(a.arg for a in args),
-            items=[ann] if has_default else [ann, _defaults(default)])
+        self.doc[name] = self.doc[name]._replace(
+            args=tuple(intern(a.arg) for a in args),
+            annotations=tuple(ann),
+            defaults=() if has_default else tuple(
+                intern(unparse(a)) if a is not None else "" for a in default))
 
     def class_api(self, root: str, name: str, bases: list[expr],
                   body: list[stmt]) -> None:
-        """Create class API."""
+        """Create class API.
+
+        The `body` should be flattened by `walk_scope`,
+        the definitions of functions and classes are ignored.
+        """
+        self.alias_view.invalidate(root)
         r_bases = [self.resolve(root, d) for d in bases]
-        if r_bases:
-            self.doc[name] += table("Bases", items=map(code, r_bases))
         is_enum = any(map(lambda s: s.startswith('enum.'), r_bases))
         mem = {}
         enums = []
-        for node in walk_body(body):
+        for node in body:
             if isinstance(node, AnnAssign) and isinstance(node.target, Name):
                 attr = node.target.id
                 if is_enum:
@@ -485,11 +962,9 @@ class Parser:
                     mem.pop(attr, None)
                     if attr in enums:
                         enums.remove(attr)
-        if enums:
-            self.doc[name] += table("Enums", items=enums)
-        elif mem:
-            self.doc[name] += table('Members', 'Type', items=(
-                (code(n), code(mem[n])) for n in sorted(mem)))
+        self.doc[name] = self.doc[name]._replace(
+            bases=tuple(r_bases), enums=tuple(enums),
+            members=() if enums else tuple(sorted(mem.items())))
 
     def func_ann(self, root: str, args: Sequence[arg], *,
                  has_self: bool, cls_method: bool) -> Iterator[str]:
@@ -511,61 +986,118 @@ class Parser:
                 yield ANY
 
     def resolve(self, root: str, node: expr, self_ty: str = "") -> str:
-        """Search and resolve global names in annotation."""
-        r = Resolver(root, self.alias, self_ty)
-        return unparse(r.generic_visit(r.visit(node)))
+        """Search and resolve global names in annotation.
+
+        The results are memoized until the alias of `root` is changed,
+        the deprecated names are counted for each resolution.
+        """
+        cache = self.resolve_cache
+        result = cache.result.setdefault(root, {})
+        key = (unparse(node), self_ty)
+        if key in result:
+            cache.hit += 1
+        else:
+            cache.miss += 1
+            r = Resolver(root, self.alias, self_ty, cache.expr)
+            result[key] = (unparse(r.generic_visit(r.visit(node))),
+                           tuple(r.deprecated))
+        ann, deprecated = result[key]
+        for idf in deprecated:
+            self.warnings.add('deprecated', idf, root)
+        return ann
+
+    def module_names(self, root: str) -> list[str]:
+        """The names to be loaded from the module."""
+        return [name for name in self.doc if name.startswith(root)]
 
     def load_docstring(self, root: str, m: ModuleType) -> None:
         """Load docstring from the module."""
-        for name in self.doc:
-            if not name.startswith(root):
-                continue
-            attr = name.removeprefix(root + '.')
-            doc = getdoc(_attr(m, attr))
-            if doc is not None:
-                self.docstring[name] = doctest(doc)
+        self.set_docstring(docstrings(root, m, self.module_names(root)))
+
+    def set_docstring(self, docs: dict[str, str]) -> None:
+        """Set the docstrings loaded from the module."""
+        self.alias_view.invalidate_names(docs)
+        for name, doc in docs.items():
+            self.docstring[name] = doctest(doc)
 
     def __is_immediate_family(self, n1: str, n2: str) -> bool:
         """Check the name is immediate family."""
         return n2.startswith(n1.removesuffix(n2.removeprefix(self.root[n2])))
 
-    def __find_alias(self):
-        """Alias substitution."""
-        for n, a in self.alias.items():
+    def __find_alias(
+        self,
+        names: list[str],
+        aliases: Iterable[tuple[str, str]],
+        touched: Optional[dict[str, bool]] = None
+    ) -> dict[str, list[tuple[str, str]]]:
+        """Alias substitution, return the moved names of each alias.
+
+        The sorted names are used as a prefix index,
+        so each alias only visits its own family, and the moved names are
+        updated in place. The moved names are saved to `touched` at the
+        first time with whether they existed.
+        """
+        moves: dict[str, list[tuple[str, str]]] = {}
+        for n, a in aliases:
             if a not in self.doc or not self.__is_immediate_family(n, a):
                 continue
-            for ch in list(self.doc):
-                if not ch.startswith(a):
-                    continue
+            # The range of `a` and `a.*`, where '/' is next to '.'
+            i = bisect_left(names, a)
+            j = bisect_left(names, a + '/', i)
+            family = names[i:j]
+            del names[i:j]
+            moved = moves[n] = []
+            for ch in family:
                 nw = n + ch.removeprefix(a)
+                if touched is not None:
+                    touched.setdefault(ch, True)
+                    touched.setdefault(nw, nw in self.doc)
                 self.doc[nw] = self.doc.pop(ch)
                 self.docstring[nw] = self.docstring.pop(ch, "")
                 name = ch.removeprefix(self.root.pop(ch))
                 self.root[nw] = nw.removesuffix(name)
-                self.level.pop(ch)
-                self.level[nw] = self.root[nw].count('.')
                 if ch in self.const:
                     self.const[nw] = self.const.pop(ch)
-
-    def is_public(self, s: str) -> bool:
-        """Check the name is public style or listed in `__all__`."""
-        if s in self.imp:
-            for ch in chain(self.doc.keys(), self.const.keys()):
-                if ch.startswith(s + '.') and is_public_family(ch):
-                    break
-            else:
-                return False
+                moved.append((ch, nw))
+            for _, nw in moved:
+                k = bisect_left(names, nw)
+                if k == len(names) or names[k] != nw:
+                    names.insert(k, nw)
+        return moves
+
+    def __public_parents(self) -> set[str]:
+        """Get the names which have public members in docs or constants."""
+        parents: set[str] = set()
+        for ch in chain(self.doc, self.const):
+            if not is_public_family(ch):
+                continue
+            i = ch.rfind('.')
+            while i > 0 and ch[:i] not in parents:
+                parents.add(ch[:i])
+                i = ch.rfind('.', 0, i)
+        return parents
+
+    def __is_public(self, s: str, parents: Container[str]) -> bool:
+        """Check the name is public with the names have public family."""
+        if s in self.imp and s not in parents:
+            return False
         all_l = self.imp[self.root[s]]
         if all_l:
             return s == self.root[s] or bool({s, parent(s)} & all_l)
         else:
             return is_public_family(s)
 
-    def __get_const(self, name: str) -> str:
+    def is_public(self, s: str) -> bool:
+        """Check the name is public style or listed in `__all__`."""
+        return self.__is_public(
+            s, self.__public_parents() if s in self.imp else set())
+
+    def __get_const(self, name: str, const_names: Iterable[str],
+                    parents: Container[str]) -> str:
         """Get constants table."""
         const = []
-        for c in self.const:
-            if self.root[c] == name and self.is_public(c):
+        for c in const_names:
+            if self.__is_public(c, parents):
                 ch = c.removeprefix(name + '.')
                 const.append((code(ch), code(self.const[c])))
         if const:
@@ -573,31 +1105,531 @@ class Parser:
         else:
             return ""
 
-    def __names_cmp(self, s: str) -> tuple[int, str, bool]:
-        """Name comparison function."""
-        return self.level[s], s.lower(), not s.islower()
+    def __names_cmp(self, s: str) -> tuple[int, str, bool, str]:
+        """Name comparison function, the names are never equal."""
+        return self.root[s].count('.'), s.lower(), not s.islower(), s
 
-    def compile(self) -> str:
-        """Compile documentation."""
-        self.__find_alias()
-        toc = ['**Table of contents:**']
-        docs = []
-        for name in sorted(self.doc, key=self.__names_cmp):
-            if not self.is_public(name):
-                continue
-            link = name.lower().replace('.', '-')
-            doc = self.doc[name].format(name, link)
-            if name in self.imp:
-                doc += self.__get_const(name)
+    def __origin_docstring(self, name: str, visited: set[str],
+                           filled: dict[str, str]) -> Optional[str]:
+        """The docstring of the name, or the one of its origin if the name
+        or its parent is imported, see `fill_docstring_tree`.
+        """
+        if name in self.docstring:
+            return self.docstring[name]
+        if name in filled:
+            return filled[name]
+        i = len(name)
+        while i > 0:
+            head = name[:i]
+            if head in self.doc_alias and head not in visited:
+                visited.add(head)
+                return self.__origin_docstring(
+                    self.doc_alias[head] + name[i:], visited, filled)
+            i = name.rfind('.', 0, i)
+        return None
+
+    def __filled(self) -> dict[str, str]:
+        """The missing docstrings filled from the origins of the names."""
+        filled: dict[str, str] = {}
+        if not self.doc_alias:
+            return filled
+        for name in self.doc:
             if name in self.docstring:
-                doc += self.docstring[name]
-            elif is_magic(name):
                 continue
+            doc = self.__origin_docstring(name, set(), filled)
+            if doc is not None:
+                filled[name] = doc
+        return filled
+
+    def __overlay(self) -> 'Parser':
+        """A view of the parser without copying the dictionaries,
+        the warnings are shared with this parser.
+        """
+        # The overlays are used as the dictionaries by the methods
+        return replace(self, doc=cast(dict, _Overlay(self.doc)),
+                       docstring=cast(dict, _Overlay(self.docstring)),
+                       root=cast(dict, _Overlay(self.root)),
+                       const=cast(dict, _Overlay(self.const)))
+
+    def __aliased(self) -> 'Parser':
+        """A view of the parser with alias substitution over the whole
+        package, the result is not kept.
+        """
+        p = self.__overlay()
+        p.docstring.update(self.__filled())
+        p.__find_alias(sorted(self.doc), self.alias.items())
+        return p
+
+    def __build_view(self) -> AliasView:
+        """Substitute the aliases over the whole package and keep the view."""
+        v = self.alias_view = AliasView()
+        p = v.parser = self.__overlay()
+        v.filled = self.__filled()
+        p.docstring.update(v.filled)
+        v.lex = sorted(self.doc)
+        v.moves = p.__find_alias(v.lex, self.alias.items())
+        v.alias = self.alias.copy()
+        for n, a in self.alias.items():
+            v.targets.setdefault(a, []).append(n)
+        v.imp = {m: frozenset(a) for m, a in self.imp.items()}
+        for ch in chain(p.doc, p.const):
+            _count_parents(v.parents, ch, 1)
+        v.order = sorted(p.doc, key=p.__names_cmp)
+        v.consts = p.__consts()
+        v.const = {c: p.root[c] for c in p.const}
+        for name in v.order:
+            p.__set_key(v, name)
+        return v
+
+    def __replay(
+        self,
+        v: AliasView,
+        seen: set[str],
+        affected: set[str]
+    ) -> Optional[dict[str, tuple[bool, bool, str]]]:
+        """Reset the related names and substitute the related aliases again.
+
+        Return the old states of the changed names, see `AliasView.reset`,
+        or none if the other aliases or the constants are moved.
+        """
+        p = v.parser
+        assert p is not None
+        old = v.reset(seen)
+        for name in seen:
+            if name in v.filled:
+                p.docstring[name] = v.filled[name]
+            if name in p.doc:
+                insort(v.lex, name)
+        v.reindex(self.alias, affected)
+        touched: dict[str, bool] = {}
+        moves = p.__find_alias(v.lex, ((n, a) for n, a in self.alias.items()
+                                       if n in affected), touched)
+        for n in affected:
+            v.moves.pop(n, None)
+        v.moves.update(moves)
+        for name, existed in touched.items():
+            if name in old:
+                continue
+            if v.is_related(self.alias, name, affected):
+                return None
+            old[name] = (existed, False, "")
+        if any(nw in p.const for moved in moves.values() for _, nw in moved):
+            return None
+        return old
+
+    def __recount(
+        self,
+        v: AliasView,
+        old: dict[str, tuple[bool, bool, str]]
+    ) -> tuple[set[str], set[str]]:
+        """Count the public parents and the constants of the changed names,
+        return the parents which are changed and the modules of the changed
+        constants.
+        """
+        parents = set()
+        roots = set()
+        for name, (in_doc, in_const, root) in old.items():
+            n = (name in self.doc) + (name in self.const) - in_doc - in_const
+            parents.update(_count_parents(v.parents, name, n))
+            if in_const:
+                roots.add(root)
+            if name in self.const:
+                v.const[name] = self.root[name]
+                roots.add(v.const[name])
+            else:
+                v.const.pop(name, None)
+        return parents, roots
+
+    def __update_keys(self, v: AliasView,
+                      old: dict[str, tuple[bool, bool, str]]) -> None:
+        """Update the public parents, the order, the constants and the keys
+        of the changed names.
+        """
+        p = v.parser
+        assert p is not None
+        changed, roots = p.__recount(v, old)
+        changed.update(old)
+        removed = {name for name, (in_doc, _, _) in old.items() if in_doc}
+        if removed:
+            v.order = [name for name in v.order if name not in removed]
+        for name in old:
+            if name in p.doc:
+                _insort(v.order, name, p.__names_cmp)
+        for root in v.update_imp(self.imp):
+            roots.add(root)
+            changed.update(n for n in v.order if p.root[n] == root)
+        if roots:
+            for root in roots:
+                v.consts.pop(root, None)
+            for c in p.const:
+                if p.root[c] in roots:
+                    v.consts.setdefault(p.root[c], []).append(c)
+        for name in changed | roots:
+            p.__set_key(v, name)
+
+    def __refresh_view(self, v: AliasView) -> bool:
+        """Substitute the aliases related to the changed names again,
+        return false if the view should be built again.
+        """
+        p = v.parser
+        assert p is not None
+        filled = self.__filled() if self.doc_alias or v.filled else v.filled
+        dirty = v.dirty
+        for root in v.roots:
+            dirty.update(self.defs.get(root, ()))
+        for name in filled.keys() | v.filled.keys():
+            if filled.get(name) != v.filled.get(name):
+                dirty.add(name)
+        v.filled = filled
+        seen, affected = v.related(self.alias, dirty)
+        if len(seen) > len(self.doc) // 4 + 64 or any(
+            nw in p.const for n in affected for _, nw in v.moves.get(n, ())
+        ):
+            return False
+        old = self.__replay(v, seen, affected)
+        if old is None:
+            return False
+        self.__update_keys(v, old)
+        v.dirty.clear()
+        v.roots.clear()
+        return True
+
+    def __view(self) -> 'Parser':
+        """The parser after alias substitution kept between compiles,
+        only the names related to the changed modules are checked again.
+        """
+        v = self.alias_view
+        if v.parser is None or not self.__refresh_view(v):
+            v = self.__build_view()
+        assert v.parser is not None
+        return v.parser
+
+    def __view_warned(self, module: Optional[str] = None) -> 'Parser':
+        """The parser after alias substitution,
+        the missing documentation of the module or all is counted.
+        """
+        self.warnings.remove(module, 'undocumented')
+        p = self.__view()
+        for name, root in self.alias_view.undocumented.items():
+            if module is None or root == module:
+                self.warnings.add('undocumented', name, root)
+        return p
+
+    def __view_keys(
+        self,
+        module: Optional[str] = None
+    ) -> tuple['Parser', _Keys]:
+        """The parser after alias substitution and the keys of the public
+        names in order, the missing documentation is counted.
+
+        Only the names of `module` are listed if provided.
+        """
+        p = self.__view_warned(module)
+        v = self.alias_view
+        keys = [(name, v.keys[name]) for name in v.order if name in v.keys]
+        if module is not None:
+            keys = [(name, key) for name, key in keys
+                    if p.root[name] == module]
+        return p, keys
+
+    def compile(self) -> str:
+        """Compile documentation.
+
+        The parser is not changed, so it can be compiled again after updated,
+        and the unchanged sections are reused.
+        The missing documentation is counted in `warnings` of this compiling.
+        """
+        p, keys = self.__view_keys()
+        sections: _Sections = {}
+        doc = ''.join(p.__compile((name for name, _ in keys), keys,
+                                  self.sections, sections))
+        self.sections = sections
+        return doc
+
+    def compile_iter(self) -> Iterator[str]:
+        """Compile documentation chunk by chunk,
+        the joined chunks are same as the result of `compile`.
+
+        The rendered sections are not kept to save memory,
+        and so is the alias substitution if it is not kept by other methods.
+        """
+        if self.alias_view.parser is not None:
+            p = self.__view_warned()
+            v = self.alias_view
+            yield from p.__compile(
+                (n for n in v.order if n in v.keys),
+                ((n, v.keys[n]) for n in v.order if n in v.keys),
+                self.sections, None)
+            return
+        self.warnings.remove(kind='undocumented')
+        p = self.__aliased()
+        parents = p.__public_parents()
+        const = p.__consts()
+        names = p.__listed(parents)
+        yield from p.__compile(names, p.__stream_keys(names, parents, const),
+                               self.sections, None)
+
+    def compile_index(self, path: str = "{}.md") -> str:
+        """Compile the table of contents of `compile_split` only."""
+        p, keys = self.__view_keys()
+        return ''.join(p.__toc((n for n, _ in keys), path)).rstrip() + '\n'
+
+    def compile_module(self, module: str) -> str:
+        """Compile the document of the module only, same as the one of
+        `compile_split`, or an empty string if it is not public.
+
+        Only the names related to the changed modules are checked again,
+        so it is faster than compiling all modules.
+        The unchanged sections are reused.
+        """
+        p, keys = self.__view_keys(module)
+        if not keys:
+            return ""
+        return ''.join(p.__sections(keys, self.sections, None))
+
+    def compile_split(self, path: str = "{}.md") -> tuple[str, dict[str, str]]:
+        """Compile the table of contents and the document of each module.
+
+        The table of contents is linked to the module documents in the path
+        `path.format(module)`. The module documents joined by newlines
+        are same as `compile` without the table of contents.
+        The unchanged sections are reused as `compile`.
+        """
+        index, modules = self.split_keys(path)
+        docs, self.sections = self.render_modules(modules)
+        return index, docs
+
+    def split_keys(self, path: str = "{}.md") -> tuple[str, dict[str, _Keys]]:
+        """The table of contents of `compile_split` and the keys of the
+        sections of each module after alias substitution.
+
+        The keys can be rendered by `render_modules` of any parser with
+        the same options, so the modules can be rendered in parallel.
+        """
+        p, keys = self.__view_keys()
+        modules: dict[str, _Keys] = {}
+        for name, key in keys:
+            modules.setdefault(p.root[name], []).append((name, key))
+        toc = ''.join(p.__toc((n for n, _ in keys), path))
+        return toc.rstrip() + '\n', modules
+
+    def render_modules(
+        self,
+        modules: dict[str, _Keys],
+        sections: Optional[_Sections] = None
+    ) -> tuple[dict[str, str], _Sections]:
+        """Render the documents of the modules from `split_keys`.
+
+        The unchanged sections of `sections` (default to the sections of
+        this parser) are reused. Return the documents and the rendered
+        sections.
+        """
+        if sections is None:
+            sections = self.sections
+        rendered: _Sections = {}
+        docs = {root: ''.join(self.__sections(keys, sections, rendered))
+                for root, keys in modules.items()}
+        return docs, rendered
+
+    def search_entries(
+        self,
+        path: str = "{}.md"
+    ) -> list[tuple[str, str, str, str]]:
+        """The `(name, kind, link, docstring)` of the public names
+        in the order of the document, the constants are in kind "constant"
+        and linked to their modules.
+
+        The names are linked to the document of their modules in
+        `path.format(module)`, with the anchors if `link` is enabled.
+        """
+        p, keys = self.__view_keys()
+        parents = self.alias_view.parents
+        const = self.alias_view.consts
+        entries = []
+        for name, (e, _, doc) in keys:
+            link = path.format(p.root[name])
+            anchor = link + '#' + name.lower().replace('.', '-')
+            entries.append((name, e.kind, anchor if p.link else link, doc))
+            if name not in p.imp:
+                continue
+            for c in const.get(name, ()):
+                if p.__is_public(c, parents):
+                    entries.append((c, 'constant',
+                                    anchor if p.link else link, ""))
+        return entries
+
+    def to_index(self) -> dict[str, object]:
+        """Export the model after alias substitution as JSON types.
+
+        The names are listed with their root modules, entries, docstrings
+        (Markdown) and public flags, the constants with their types,
+        and the `__all__` names of the modules.
+        The result can be rendered by `from_index` without parsing again.
+        """
+        p = self.__aliased()
+        parents = p.__public_parents()
+        names = {}
+        for name, e in p.doc.items():
+            names[name] = {'root': p.root[name], **e._asdict(),
+                           'docstring': p.docstring.get(name),
+                           'public': p.__is_public(name, parents)}
+        const = {}
+        for c, ann in p.const.items():
+            const[c] = {'root': p.root[c], 'type': ann,
+                        'public': p.__is_public(c, parents)}
+        return {'names': names, 'constants': const,
+                'all': {m: sorted(a) for m, a in p.imp.items()}}
+
+    @classmethod
+    def from_index(cls: type[_Self], index: dict[str, Any], link: bool,
+                   level: int, toc: bool) -> _Self:
+        """Create a parser by options from the result of `to_index`.
+
+        The names are substituted already, so they have no alias.
+        """
+        p = cls.new(link, level, toc)
+        for name, d in index['names'].items():
+            p.root[name] = d['root']
+            p.defs.setdefault(d['root'], set()).add(name)
+            p.doc[name] = Entry(
+                d['kind'], d['name'], d['nested'], tuple(d['decorators']),
+                tuple(d['args']), tuple(d['annotations']),
+                tuple(d['defaults']), tuple(d['bases']), tuple(d['enums']),
+                tuple((n, t) for n, t in d['members']))
+            if d['docstring'] is not None:
+                p.docstring[name] = d['docstring']
+        for c, d in index['constants'].items():
+            p.root[c] = d['root']
+            p.defs.setdefault(d['root'], set()).add(c)
+            p.const[c] = d['type']
+        p.imp = {m: set(a) for m, a in index['all'].items()}
+        return p
+
+    def __render(self, name: str, e: Entry) -> str:
+        """Render the entry of the name into Markdown."""
+        link = name.lower().replace('.', '-')
+        if e.kind == 'module':
+            doc = '#' * self.b_level + f"# Module `{name}`"
+        else:
+            level = '#' * (self.b_level + (3 if e.nested else 2))
+            shirt_name = esc_underscore(e.name)
+            if e.kind == 'class':
+                doc = f"{level} class {shirt_name}\n\n"
+            elif e.kind == 'async def':
+                doc = f"{level} async {shirt_name}()\n\n"
             else:
-                logger.warning(f"Missing documentation for {name}")
+                doc = f"{level} {shirt_name}()\n\n"
+            doc += f"*Full name:* `{name}`"
+        if self.link:
+            doc += f"\n<a id=\"{link}\"></a>"
+        doc += '\n\n'
+        if e.decorators:
+            doc += table("Decorators", items=map(code, e.decorators))
+        if e.args:
+            ann = map(code, e.annotations)
+            doc += table(*e.args, items=[ann] if not e.defaults
+                         else [ann, map(code, e.defaults)])
+        if e.bases:
+            doc += table("Bases", items=map(code, e.bases))
+        if e.enums:
+            doc += table("Enums", items=e.enums)
+        elif e.members:
+            doc += table('Members', 'Type', items=(
+                (code(n), code(t)) for n, t in e.members))
+        return doc
+
+    def __consts(self) -> dict[str, list[str]]:
+        """The constants grouped by their modules."""
+        const: dict[str, list[str]] = {}
+        for c in self.const:
+            const.setdefault(self.root[c], []).append(c)
+        return const
+
+    def __listed(self, parents: set[str]) -> list[str]:
+        """The public names in order, the magic names are listed only if
+        they have docstrings.
+        """
+        return sorted((n for n in self.doc if self.__is_public(n, parents)
+                       and (n in self.docstring or not is_magic(n))),
+                      key=self.__names_cmp)
+
+    def __key(self, name: str, parents: Container[str],
+              const: dict[str, list[str]]) -> tuple[Entry, str, str]:
+        """The entry, constants and docstring of the listed name."""
+        if name in self.imp:
+            c = self.__get_const(name, const.get(name, ()), parents)
+        else:
+            c = ""
+        return self.doc[name], c, self.docstring.get(name, "")
+
+    def __stream_keys(
+        self,
+        names: Iterable[str],
+        parents: set[str],
+        const: dict[str, list[str]]
+    ) -> Iterator[tuple[str, tuple[Entry, str, str]]]:
+        """The keys of the listed names one by one,
+        the missing documentation is counted.
+        """
+        for name in names:
+            if name not in self.docstring:
+                self.warnings.add('undocumented', name, self.root[name])
+            yield name, self.__key(name, parents, const)
+
+    def __set_key(self, v: AliasView, name: str) -> None:
+        """Update the key of the name in the view, see `__listed`."""
+        v.keys.pop(name, None)
+        v.undocumented.pop(name, None)
+        if (
+            name not in self.doc
+            or not self.__is_public(name, v.parents)
+            or (name not in self.docstring and is_magic(name))
+        ):
+            return
+        v.keys[name] = self.__key(name, v.parents, v.consts)
+        if name not in self.docstring:
+            v.undocumented[name] = self.root[name]
+
+    def __toc(self, names: Iterable[str], path: str) -> Iterator[str]:
+        """Table of contents of the names, linked to the document of
+        their modules in `path.format(module)`.
+        """
+        yield '**Table of contents:**'
+        for name in names:
+            link = path.format(self.root[name])
+            if self.link:
+                link += '#' + name.lower().replace('.', '-')
             level = name.removeprefix(self.root[name]).count('.')
-            toc.append(" " * 4 * level + f"+ [{code(name)}](#{link})")
-            docs.append(doc.rstrip())
+            yield '\n' + " " * 4 * level + f"+ [{code(name)}]({link})"
+        yield '\n\n'
+
+    def __sections(self, keys: Iterable[tuple[str, tuple[Entry, str, str]]],
+                   sections: _Sections,
+                   rendered: Optional[_Sections]) -> Iterator[str]:
+        """Render the sections of the names.
+
+        The unchanged sections are reused from `sections`,
+        and the rendered sections are saved to `rendered` if provided.
+        """
+        for i, (name, key) in enumerate(keys):
+            section = sections.get(name)
+            if section is None or section[0] != key:
+                doc = self.__render(name, key[0]) + key[1] + key[2]
+                section = (key, doc.rstrip())
+            if rendered is not None:
+                rendered[name] = section
+            if i:
+                yield "\n\n"
+            yield section[1]
+        yield '\n'
+
+    def __compile(self, names: Iterable[str],
+                  keys: Iterable[tuple[str, tuple[Entry, str, str]]],
+                  sections: _Sections,
+                  rendered: Optional[_Sections]) -> Iterator[str]:
+        """Compile documentation of the listed names and their keys
+        after alias substitution, see `__sections` for the other arguments.
+        """
         if self.toc:
-            return '\n'.join(toc) + '\n\n' + "\n\n".join(docs) + '\n'
-        return "\n\n".join(docs) + '\n'
+            yield from self.__toc(names, "")
+        yield from self.__sections(keys, sections, rendered)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""Profiler of the documentation builds."""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional, ContextManager
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from sys import platform
+from json import dump
+from .parser import Parser
+
+TOP = 10
+
+
+def peak_memory() -> Optional[int]:
+    """Peak resident memory of this process and its children in bytes,
+    or `None` if not supported by the platform.
+    """
+    try:
+        from resource import getrusage, RUSAGE_SELF, RUSAGE_CHILDREN
+    except ImportError:
+        return None
+    rss = max(getrusage(RUSAGE_SELF).ru_maxrss,
+              getrusage(RUSAGE_CHILDREN).ru_maxrss)
+    # Kilobytes except macOS
+    return rss if platform == 'darwin' else rss * 1024
+
+
+class Profiler:
+    """Record the wall time of the build phases and the modules.
+
+    The phases are:
+    + "discover": searching modules.
+    + "read": reading the source and stub files.
+    + "ast": the `ast.parse` function.
+    + "analyze": collecting the names of the syntax tree,
+      including "resolve".
+    + "resolve": the annotation resolution.
+    + "partials": loading from the cache or waiting for the worker processes,
+      which are used if caching or parsing in parallel.
+    + "merge": merging the partial parsers.
+    + "extension": loading the extension modules.
+    + "compile": compiling the document.
+    + "write": writing the document, including "compile" if streaming.
+
+    Usage:
+    >>> prof = Profiler()
+    >>> with prof.phase('read'):
+    >>>     ...
+    >>> print(prof.report())
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.modules: dict[str, float] = {}
+        self.total = 0.
+        self.hit = 0
+        self.miss = 0
+        self.__t0 = perf_counter()
+
+    def stop(self) -> None:
+        """Stop the total time."""
+        self.total = perf_counter() - self.__t0
+
+    def add(self, name: str, t: float) -> None:
+        """Add time to the phase."""
+        self.phases[name] = self.phases.get(name, 0.) + t
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the phase."""
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, perf_counter() - t0)
+
+    @contextmanager
+    def module(self, name: str) -> Iterator[None]:
+        """Time the parsing of the module, the source and stub are summed."""
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            t = perf_counter() - t0
+            self.modules[name] = self.modules.get(name, 0.) + t
+
+    @contextmanager
+    def resolving(self, p: Parser) -> Iterator[None]:
+        """Time `Parser.resolve` of the parser in the context."""
+        resolve = p.resolve
+
+        def timed(root, node, self_ty=""):
+            t0 = perf_counter()
+            try:
+                return resolve(root, node, self_ty)
+            finally:
+                self.add('resolve', perf_counter() - t0)
+
+        p.resolve = timed  # type: ignore[method-assign]
+        try:
+            yield
+        finally:
+            del p.resolve
+
+    def count(self, p: Parser) -> None:
+        """Count the resolver cache of the parser."""
+        self.hit += p.resolve_cache.hit
+        self.miss += p.resolve_cache.miss
+
+    def slowest(self, top: int = TOP) -> list[tuple[str, float]]:
+        """The slowest modules."""
+        return sorted(self.modules.items(), key=lambda m: -m[1])[:top]
+
+    def result(self, top: int = TOP) -> dict[str, object]:
+        """The result in JSON compatible format."""
+        return {
+            'total': self.total,
+            'phases': self.phases,
+            'slowest': [{'module': n, 'time': t}
+                        for n, t in self.slowest(top)],
+            'modules': len(self.modules),
+            'resolve_cache': {'hit': self.hit, 'miss': self.miss},
+            'peak_memory': peak_memory(),
+        }
+
+    def report(self, top: int = TOP) -> str:
+        """The result as tables."""
+        total = self.total or sum(self.phases.values()) or 1.
+        lines = [f"{'phase':<12}{'time (s)':>10}{'ratio':>8}"]
+        for name, t in self.phases.items():
+            lines.append(f"{name:<12}{t:>10.3f}{t / total:>8.1%}")
+        lines.append(f"{'total':<12}{self.total:>10.3f}")
+        if self.modules:
+            lines.append(f"slowest {top} of {len(self.modules)} modules:")
+            for name, t in self.slowest(top):
+                lines.append(f"{t:>10.3f}  {name}")
+        n = self.hit + self.miss
+        lines.append(f"resolve cache: {self.hit} hit, {self.miss} miss "
+                     f"({self.hit / (n or 1):.1%} hit rate)")
+        peak = peak_memory()
+        if peak is not None:
+            lines.append(f"peak memory: {peak / 1024 / 1024:.1f} MB")
+        return '\n'.join(lines)
+
+    def dump(self, path: str, top: int = TOP) -> None:
+        """Dump the result as JSON."""
+        with open(path, 'w+', encoding='utf-8') as f:
+            dump(self.result(top), f, indent=2)
+
+
+def phase(prof: Optional[Profiler], name: str) -> ContextManager[None]:
+    """Time the phase if profiling."""
+    return nullcontext() if prof is None else prof.phase(name)
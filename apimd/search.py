@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Prebuilt full-text search index of the documents.
+
+The index is an inverted index of the tokens of the qualified names and
+the docstrings, sharded by the prefix of the tokens, so a client can load
+only the shards of its query.
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from collections import Counter
+from collections.abc import Iterable
+from functools import lru_cache
+from re import compile as re_compile
+from json import dumps
+
+SEARCH_FORMAT = 1
+SEARCH_DIR = 'search'
+PREFIX = 2
+CHUNK = 512
+DOC_CAP = 3
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has if in is it its of on or that the
+this to was will with
+""".split())
+_TOKEN = re_compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split the text into lowercase tokens,
+    the words are split by underscores and camel case either.
+
+    >>> tokenize("load_index HTTPServer")
+    ['load', 'index', 'http', 'server']
+    """
+    return [t.lower() for t in _TOKEN.findall(text)]
+
+
+@lru_cache(maxsize=None)
+def _words(part: str) -> tuple[str, ...]:
+    """The tokens of a part of the names, which are repeated a lot."""
+    return tuple(tokenize(part))
+
+
+def name_terms(name: str) -> dict[str, int]:
+    """The weighted terms of the qualified name.
+
+    The words of the last part weigh the most, and the most if it is
+    a single word, then the words of the parents.
+    """
+    terms: dict[str, int] = {}
+    *parents, last = name.split('.')
+    for part in parents:
+        for t in _words(part):
+            terms[t] = terms.get(t, 0) + 1
+    words = _words(last)
+    weight = 8 if len(words) == 1 else 4
+    for t in words:
+        terms[t] = terms.get(t, 0) + weight
+    return terms
+
+
+@lru_cache(maxsize=4096)
+def doc_terms(doc: str) -> tuple[tuple[str, int], ...]:
+    """The terms of the docstring, at most `DOC_CAP` for each term,
+    the stop words and single characters are skipped.
+    """
+    terms = Counter(tokenize(doc))
+    return tuple((t, min(n, DOC_CAP)) for t, n in terms.items()
+                 if len(t) > 1 and t not in STOP_WORDS)
+
+
+def summary(doc: str) -> str:
+    """The first paragraph of the docstring in one line."""
+    return ' '.join(doc.strip().split('\n\n', maxsplit=1)[0].split())
+
+
+def _json(obj: object) -> str:
+    """Compact JSON."""
+    return dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def build_search(
+    entries: Iterable[tuple[str, str, str, str]],
+    *,
+    prefix: int = PREFIX,
+    chunk: int = CHUNK
+) -> dict[str, str]:
+    """Build the search index of the `(name, kind, link, docstring)`
+    entries, see `Parser.search_entries`.
+
+    Return the JSON files by name:
+
+    + "index.json": the format, the version, the number of documents,
+      the sizes of the prefixes and the chunks, and the list of shards.
+    + "docs-K.json": the K-th chunk of `chunk` documents,
+      each is `[name, kind, link, summary]`.
+    + "shard-PREFIX.json": the shard of the tokens which start with
+      the first `prefix` characters (or the whole token if shorter),
+      each token maps to the `[document, score]` pairs in descending order
+      of the scores.
+
+    The document K is the `K % chunk`-th document of the `K // chunk`
+    chunk. The result is deterministic for the same entries.
+    """
+    from apimd import __version__
+    docs = []
+    postings: dict[str, list[tuple[int, int]]] = {}
+    for i, (name, kind, link, doc) in enumerate(entries):
+        docs.append([name, kind, link, summary(doc)])
+        terms = name_terms(name)
+        for t, n in doc_terms(doc):
+            terms[t] = terms.get(t, 0) + n
+        for t, score in terms.items():
+            # Negative scores are sorted in descending order
+            postings.setdefault(t, []).append((-score, i))
+    shards: dict[str, dict[str, list[tuple[int, int]]]] = {}
+    for t in sorted(postings):
+        shards.setdefault(t[:prefix], {})[t] = [
+            (i, -score) for score, i in sorted(postings[t])]
+    files = {'index.json': _json({
+        'format': SEARCH_FORMAT,
+        'version': __version__,
+        'docs': len(docs),
+        'prefix': prefix,
+        'chunk': chunk,
+        'shards': list(shards),
+    })}
+    for k in range(0, len(docs), chunk):
+        files[f"docs-{k // chunk}.json"] = _json(docs[k:k + chunk])
+    for key, shard in shards.items():
+        files[f"shard-{key}.json"] = _json(shard)
+    return files
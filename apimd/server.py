@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""Local preview server of the documents.
+
+The packages are parsed when they are requested at the first time,
+and each page is compiled on demand and kept in a LRU cache.
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from collections import OrderedDict
+from sys import path as sys_path
+from time import monotonic
+from threading import Lock
+from urllib.parse import unquote, urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from .logger import logger
+from .parser import Parser
+from .cache import CACHE_SIZE, Cache
+from .extension import EXT_TIMEOUT
+from .defaults import PORT
+from .archive import is_archive
+from .loader import (
+    SOURCE, _Snapshot, _load, _snapshot, _update, _site_path,
+    _document, _module_link, _split_dir,
+)
+
+HOST = '127.0.0.1'
+PAGES = 256
+
+
+class Site:
+    """The pages of the packages in the layout of the split output.
+
+    + "/": the links to the packages.
+    + "/name-api.md": the table of contents of the package.
+    + "/name-api/module.md": the document of the module.
+
+    The files of a package are checked at most every `interval` seconds,
+    only the changed modules are parsed again. The pages are cached until
+    any module of the package is changed, because the names of a page can
+    be re-exported from other modules. Compiling a page again only checks
+    the names related to the changed modules.
+    At most `pages` pages are cached.
+    """
+
+    def __init__(self, root_names: dict[str, str], *, link: bool = True,
+                 level: int = 1, toc: bool = False, jobs: int = 1,
+                 cache: Optional[str] = None, cache_size: int = CACHE_SIZE,
+                 ext_timeout: float = EXT_TIMEOUT, source: str = SOURCE,
+                 interval: float = 1., pages: int = PAGES):
+        self.titles = {_split_dir(name): (title, name)
+                       for title, name in root_names.items()}
+        self.link = link
+        self.level = level
+        self.toc = toc
+        self.jobs = jobs
+        self.cache = cache
+        self.cache_size = cache_size
+        self.ext_timeout = ext_timeout
+        self.source = source
+        self.interval = interval
+        self.pages_size = pages
+        self.parsers: dict[str, Parser] = {}
+        self.snapshots: dict[str, _Snapshot] = {}
+        self.checked: dict[str, float] = {}
+        self.versions: dict[str, int] = {}
+        self.pages: OrderedDict[tuple[str, str],
+                                tuple[int, str]] = OrderedDict()
+        self.lock = Lock()
+
+    def __parser(self, name: str) -> Parser:
+        """The parser of the package, load it at the first time,
+        and update the changed modules.
+        """
+        if name not in self.parsers:
+            logger.info("Load root: %s", name)
+            c = None
+            if self.cache is not None:
+                c = Cache(self.cache, link=self.link, level=self.level,
+                          toc=self.toc, source=self.source,
+                          max_size=self.cache_size)
+            self.snapshots[name] = _snapshot(name)
+            self.versions[name] = 0
+            self.parsers[name] = _load(
+                name, _site_path(name), self.link, self.level, self.toc,
+                jobs=self.jobs, cache=c, ext_timeout=self.ext_timeout,
+                source=self.source)
+            if c is not None:
+                c.close()
+        elif monotonic() - self.checked[name] >= self.interval:
+            new = _snapshot(name)
+            if new != self.snapshots[name]:
+                _update(self.parsers[name], self.snapshots[name], new,
+                        jobs=self.jobs, ext_timeout=self.ext_timeout,
+                        source=self.source)
+                self.snapshots[name] = new
+                self.versions[name] += 1
+        self.checked[name] = monotonic()
+        return self.parsers[name]
+
+    def __page(self, name: str, module: Optional[str]) -> str:
+        """Compile the page of the package, the table of contents
+        if `module` is not provided.
+        """
+        p = self.__parser(name)
+        version = self.versions[name]
+        key = (name, module or "")
+        if key in self.pages and self.pages[key][0] == version:
+            self.pages.move_to_end(key)
+            return self.pages[key][1]
+        if module is None:
+            title = self.titles[_split_dir(name)][0]
+            doc = _document(title, p.compile_index(_module_link(name)),
+                            self.level)
+        else:
+            logger.info("Compile: %s", module)
+            doc = p.compile_module(module)
+        self.pages[key] = (version, doc)
+        self.pages.move_to_end(key)
+        if len(self.pages) > self.pages_size:
+            self.pages.popitem(last=False)
+        return doc
+
+    def get(self, path: str) -> Optional[str]:
+        """The page of the URL path, or `None` if not found."""
+        path = unquote(urlsplit(path).path).strip('/')
+        if not path:
+            return ''.join(f"+ [{title}]({folder}.md)\n"
+                           for folder, (title, _) in self.titles.items())
+        folder, _, module = path.partition('/')
+        if not module and folder.endswith('.md'):
+            folder = folder.removesuffix('.md')
+            if folder not in self.titles:
+                return None
+            with self.lock:
+                return self.__page(self.titles[folder][1], None)
+        if folder not in self.titles or not module.endswith('.md'):
+            return None
+        name = self.titles[folder][1]
+        module = module.removesuffix('.md')
+        if module != name and not module.startswith(name + '.'):
+            return None
+        with self.lock:
+            return self.__page(name, module) or None
+
+
+def _handler(site: Site) -> type[BaseHTTPRequestHandler]:
+    """The request handler of the site."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """Send the pages as Markdown."""
+
+        def do_GET(self) -> None:
+            """Send the page."""
+            doc = site.get(self.path)
+            if doc is None:
+                self.send_error(404)
+                return
+            data = doc.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', "text/markdown; charset=utf-8")
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Cache-Control', "no-cache")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: object) -> None:
+            """Log the requests for debugging."""
+            logger.debug(format, *args)
+
+    return Handler
+
+
+def serve(
+    root_names: dict[str, str],
+    pwd: Optional[str] = None,
+    *,
+    host: str = HOST,
+    port: int = PORT,
+    link: bool = True,
+    level: int = 1,
+    toc: bool = False,
+    jobs: int = 1,
+    cache: Optional[str] = None,
+    cache_size: int = CACHE_SIZE,
+    ext_timeout: float = EXT_TIMEOUT,
+    source: str = SOURCE,
+    interval: float = 1.,
+    pages: int = PAGES
+) -> None:
+    """Serve the documents on `host:port` until interrupted.
+
+    The pages are in the same layout as the split output of `gen_api`,
+    see `Site`. Other options are same as `gen_api`.
+    The archives can not be served.
+    """
+    for title, name in list(root_names.items()):
+        if is_archive(name):
+            logger.warning("archive '%s' can not be served", name)
+            root_names = {t: n for t, n in root_names.items() if t != title}
+    if pwd is not None:
+        sys_path.append(pwd)
+    site = Site(root_names, link=link, level=level, toc=toc, jobs=jobs,
+                cache=cache, cache_size=cache_size, ext_timeout=ext_timeout,
+                source=source, interval=interval, pages=pages)
+    with ThreadingHTTPServer((host, port), _handler(site)) as server:
+        logger.info("Serving on http://%s:%s/", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stop serving")
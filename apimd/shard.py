@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+"""Sharded generation across machines.
+
+Each shard parses a part of the modules into the partial parsers,
+then the shards are merged in the order of the modules,
+the result is same as parsing on a single machine.
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional, Any
+from collections.abc import Sequence
+from sys import path as sys_path
+from os import mkdir, replace
+from os.path import isdir
+from pickle import load, dump, HIGHEST_PROTOCOL
+from .logger import logger
+from .parser import Parser
+from .cache import CACHE_SIZE, Cache
+from .extension import EXT_TIMEOUT
+from .archive import is_archive
+from .loader import (
+    SOURCE, _roots, _discover, _parse_partials, _parse_archive, _parse,
+    _load_extensions, _output, _report,
+)
+
+SHARD_FORMAT = 1
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """Parse the shard syntax "i/N" into `(i, N)`, where `0 <= i < N`.
+
+    Raise `ValueError` if the syntax is invalid.
+    """
+    i, _, n = shard.partition('/')
+    if not i.isdigit() or not n.isdigit() or not 0 <= int(i) < int(n):
+        raise ValueError(f"invalid shard: {shard}")
+    return int(i), int(n)
+
+
+def _units(modules: Sequence[Sequence[tuple[str, str]]],
+           pwds: Sequence[str]) -> list[Optional[tuple[int, int]]]:
+    """The work units of the roots in order, `(root, -1)` for an archive,
+    `(root, k)` for the `k`-th module of the root, and `None` for
+    the repeated module names (stub packages), which are parsed
+    in the merge step with the merged state.
+    """
+    seen = set()
+    units: list[Optional[tuple[int, int]]] = []
+    for r, (package, pwd) in enumerate(zip(modules, pwds)):
+        if is_archive(pwd):
+            units.append((r, -1))
+        for k, (name, _) in enumerate(package):
+            units.append(None if name in seen else (r, k))
+            seen.add(name)
+    return units
+
+
+def gen_shard(
+    root_names: dict[str, str],
+    pwd: Optional[str] = None,
+    *,
+    shard: tuple[int, int],
+    out: str,
+    link: bool = True,
+    level: int = 1,
+    toc: bool = False,
+    jobs: int = 1,
+    cache: Optional[str] = None,
+    cache_size: int = CACHE_SIZE,
+    source: str = SOURCE
+) -> None:
+    """Parse the `shard = (i, N)` part of the modules and save the partial
+    parsers to the file `out`, which can be merged by `merge_shards`.
+
+    The modules of all packages are numbered in the order of
+    `walk_packages`, and the shard parses the modules which number
+    modulo N is i, in `jobs` processes. The repeated module names
+    (stub packages) and the extension modules are loaded in the merge step.
+    Other options are same as `gen_api`.
+    """
+    from apimd import __version__
+    i, n = shard
+    if pwd is not None:
+        sys_path.append(pwd)
+    c = None
+    if cache is not None:
+        c = Cache(cache, link=link, level=level, toc=toc, source=source,
+                  max_size=cache_size)
+    roots = _roots(root_names)
+    modules = [_discover(name, pwd) for _, name, pwd in roots]
+    units = [u for u in _units(modules, [pwd for _, _, pwd in roots])
+             if u is not None][i::n]
+    todo = [modules[r][k] for r, k in units if k >= 0]
+    logger.info("Shard %s/%s: %s module(s) of %s", i, n, len(units),
+                sum(map(len, modules)))
+    partials: dict[tuple[int, int], Any] = {}
+    it = _parse_partials(todo, link, level, toc, jobs, c, source)
+    for r, k in units:
+        if k >= 0:
+            partials[r, k] = next(it)
+            continue
+        p = Parser.new(link, level, toc)
+        _parse_archive(roots[r][1], roots[r][2], p, None, source)
+        partials[r, k] = (p, True)
+    for _ in it:
+        pass
+    if c is not None:
+        c.close()
+    state = {
+        'format': SHARD_FORMAT,
+        'version': __version__,
+        'shard': (i, n),
+        'options': {'link': link, 'level': level, 'toc': toc,
+                    'source': source},
+        'roots': roots,
+        'modules': [[name for name, _ in package] for package in modules],
+        'paths': modules,
+        'partials': partials,
+    }
+    tmp = out + '.tmp'
+    with open(tmp, 'wb') as f:
+        dump(state, f, HIGHEST_PROTOCOL)
+    replace(tmp, out)
+    logger.info("Write shard: %s", out)
+
+
+def _load_shards(paths: Sequence[str]) -> list[dict[str, Any]]:
+    """Load the shard files, and check they are the complete shards of
+    the same packages and options.
+
+    Raise `ValueError` if not.
+    """
+    from apimd import __version__
+    states = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            state = load(f)
+        if (not isinstance(state, dict)
+                or state.get('format') != SHARD_FORMAT
+                or state.get('version') != __version__):
+            raise ValueError(f"unsupported shard file: {path}")
+        states.append(state)
+    if not states:
+        raise ValueError("no shard file")
+    first = states[0]
+    n = first['shard'][1]
+    if sorted(s['shard'] for s in states) != [(i, n) for i in range(n)]:
+        raise ValueError(f"shards are incomplete or repeated, "
+                         f"need 0/{n} to {n - 1}/{n}")
+    for state in states:
+        for key in ('options', 'roots', 'modules'):
+            if state[key] != first[key]:
+                raise ValueError(f"shards are generated with different "
+                                 f"{key}: shard {state['shard'][0]}/{n}")
+    return states
+
+
+def merge_shards(
+    paths: Sequence[str],
+    *,
+    prefix: str = 'docs',
+    dry: bool = False,
+    jobs: int = 1,
+    ext_timeout: float = EXT_TIMEOUT,
+    stream: bool = False,
+    split: bool = False,
+    search: bool = False,
+    index: Optional[str] = None,
+    warnings_out: Optional[str] = None,
+    max_warnings: Optional[int] = None
+) -> Sequence[str]:
+    """Merge the shard files of `gen_shard` and generate API,
+    the documents are same as `gen_api` on a single machine.
+
+    The partial parsers are merged in the order of the modules,
+    and the aliases and `__all__` of the merged parsers are resolved when
+    compiling, so the names across the shards are substituted.
+    The repeated module names (stub packages) and the extension modules
+    are loaded here, their paths should be same as the shards.
+    The options of the parsers are same as the shards,
+    other options are same as `gen_api`.
+
+    Raise `ValueError` if the shards are not complete or not matched.
+    """
+    states = _load_shards(paths)
+    first = states[0]
+    options = first['options']
+    partials = {}
+    for state in states:
+        partials.update(state['partials'])
+    roots = first['roots']
+    modules = first['paths']
+    if not isdir(prefix):
+        logger.info("Create directory: %s", prefix)
+        mkdir(prefix)
+    link, level, toc = options['link'], options['level'], options['toc']
+    parsers = []
+    extensions = []
+    for r, ((title, name, pwd), package) in enumerate(zip(roots, modules)):
+        logger.info("Merge root: %s (%s)", name, title)
+        p = Parser.new(link, level, toc)
+        if is_archive(pwd):
+            p.merge(partials[r, -1][0])
+        for k, (module, path) in enumerate(package):
+            if (r, k) in partials:
+                sub, pure_py = partials[r, k]
+                p.merge(sub)
+            else:
+                pure_py = _parse(module, path, p, source=options['source'])
+            if not pure_py:
+                extensions.append((p, module, path, p.module_names(module)))
+        parsers.append(p)
+    _load_extensions(extensions, jobs=jobs, timeout=ext_timeout)
+    titles = [(title, name) for title, name, _ in roots]
+    if index is not None:
+        from .index import save_index
+        save_index(index, ((title, name, p) for (title, name), p
+                           in zip(titles, parsers)))
+        logger.info("Write index: %s", index)
+    docs, written, skipped = _output(
+        titles, parsers, prefix=prefix, level=level, dry=dry, jobs=jobs,
+        stream=stream, split=split, search=search, prof=None)
+    if not dry:
+        logger.info("%s file(s) written, %s file(s) unchanged",
+                    written, skipped)
+    _report(parsers, warnings_out, max_warnings)
+    return docs
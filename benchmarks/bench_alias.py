@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of alias substitution.
+
+The time should grow near-linearly with the number of modules.
+
+Usage: python benchmarks/bench_alias.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from time import perf_counter
+from apimd.parser import Parser
+
+MODULE = '''\
+"""Module {0}."""
+from typing import Optional
+from os.path import join
+X{0} = {0}
+class C{0}:
+    """Class."""
+    def method(self, a: Optional[int]) -> int:
+        """Method."""
+def func{0}() -> None:
+    """Function."""
+'''
+
+
+def make_parser(modules: int) -> Parser:
+    """Parse a synthetic package with re-exported classes."""
+    p = Parser()
+    p.parse('pkg', '"""Package."""\n' + ''.join(
+        f"from .m{i} import C{i}\n" for i in range(modules)))
+    for i in range(modules):
+        p.parse(f'pkg.m{i}', MODULE.format(i))
+    return p
+
+
+def main() -> None:
+    """Main function."""
+    for modules in (1000, 2000, 5000):
+        p = make_parser(modules)
+        t0 = perf_counter()
+        p._Parser__find_alias(sorted(p.doc), p.alias.items())  # type: ignore
+        t = perf_counter() - t0
+        print(f"{modules:>5} modules, {len(p.alias)} aliases: "
+              f"{t * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of documentation compiling.
+
+The time should grow near-linearly with the number of modules.
+
+Usage: python benchmarks/bench_compile.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from time import perf_counter
+from bench_alias import make_parser
+
+
+def main() -> None:
+    """Main function."""
+    for modules in (1000, 2000, 5000):
+        p = make_parser(modules)
+        t0 = perf_counter()
+        p.compile()
+        t = perf_counter() - t0
+        print(f"{modules:>5} modules, {len(p.doc)} names: {t * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
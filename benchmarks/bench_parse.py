@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of module parsing on class-heavy modules.
+
+The syntax trees are parsed before timing, so only the traversal and
+the analysis of `Parser.parse_tree` are measured.
+
+Usage: python benchmarks/bench_parse.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from time import perf_counter
+from gc import collect, disable, enable
+from ast import parse
+from apimd.parser import Parser
+
+REPEAT = 10
+
+
+def make_module(classes: int, members: int) -> str:
+    """Script of a module with many classes, members and nested classes."""
+    s = ['"""Module."""', "from typing import Optional", "X = 1"]
+    for c in range(classes):
+        s.append(f"class C{c}:")
+        s.append('    """Class."""')
+        for m in range(members):
+            s.append(f"    attr{m}: int = {m}")
+            s.append(f"    const{m} = {m}")
+        s.append("    try:")
+        s.append("        cached: Optional[int] = None")
+        s.append("    except ImportError:")
+        s.append("        pass")
+        for m in range(members):
+            s.append(f"    def method{m}(self) -> Optional[int]:")
+            s.append('        """Method."""')
+        s.append("    class Inner:")
+        s.append('        """Inner class."""')
+        for m in range(members):
+            s.append(f"        value{m}: int")
+    return '\n'.join(s) + '\n'
+
+
+def main() -> None:
+    """Main function."""
+    for classes, members in ((100, 10), (100, 50), (500, 50)):
+        root_node = parse(make_module(classes, members), type_comments=True)
+        best = float('inf')
+        for _ in range(REPEAT):
+            p = Parser()
+            collect()
+            disable()
+            t0 = perf_counter()
+            p.parse_tree('pkg', root_node)
+            best = min(best, perf_counter() - t0)
+            enable()
+        print(f"{classes:>3} classes, {members:>2} members: "
+              f"{best * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
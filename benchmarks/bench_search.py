@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the search index, which is built after compiling.
+
+The modules are parsed before timing, the package is same as
+`bench_split.py`. The sizes of the files a client loads to search a word
+are compared with the whole document.
+
+Usage: python benchmarks/bench_search.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from apimd.search import build_search
+from bench_split import make_parser, best, clear
+
+
+def main() -> None:
+    """Main function."""
+    p = make_parser()
+    doc = p.compile()
+    t = best(p.compile, lambda: clear(p))
+    print(f"{'compile':<20} {t * 1e3:>10.3f} ms")
+    t = best(lambda: build_search(p.search_entries("pkg-api.md")))
+    print(f"{'search index':<20} {t * 1e3:>10.3f} ms")
+    files = build_search(p.search_entries("pkg-api.md"))
+    print(f"{'document':<20} {len(doc.encode()) / 1024:>10.1f} KB")
+    print(f"{'search files':<20} {len(files):>10}")
+    query = files['index.json'] + files['shard-st.json'] + files['docs-0.json']
+    print(f"{'search storage':<20} {len(query.encode()) / 1024:>10.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the split output, which compiles the module documents
+in parallel.
+
+The modules are parsed before timing, so only compiling is measured,
+including sending the keys and the sections to the worker processes.
+The synthetic package and the timing are shared with other benchmarks.
+
+Usage: python benchmarks/bench_split.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from typing import Optional
+from time import perf_counter
+from collections.abc import Callable
+from apimd.parser import Parser
+from apimd.loader import _compile_split_roots
+
+MODULES = 400
+REPEAT = 3
+
+
+def make_module(i: int, functions: int) -> str:
+    """Script of a documented module with functions and a class."""
+    s = [f'"""Module {i}."""', "from typing import Optional"]
+    for f in range(functions):
+        s.append(f"def load_item{f}(a: int, b: Optional[str] = None) -> str:")
+        s.append(f'    """Load the item {f} from the storage.\n\n'
+                 f'    >>> load_item{f}(1)\n    """')
+    s.append("class Storage:")
+    s.append('    """Storage of the items."""')
+    for f in range(functions):
+        s.append(f"    attr{f}: int")
+        s.append(f"    def save{f}(self) -> Optional[int]:")
+        s.append('        """Save the items."""')
+    return '\n'.join(s) + '\n'
+
+
+def make_parser(modules: int = MODULES, functions: int = 30) -> Parser:
+    """Parse a synthetic package of the documented modules."""
+    p = Parser.new(True, 1, False)
+    p.parse('pkg', '"""Package."""\n')
+    for i in range(modules):
+        p.parse(f'pkg.m{i}', make_module(i, functions))
+    return p
+
+
+def clear(p: Parser) -> None:
+    """Drop the rendered sections and the alias substitution kept by
+    the parser, so the next compiling starts from scratch.
+    """
+    p.sections.clear()
+    p.alias_view.invalidate()
+
+
+def best(f: Callable[[], object],
+         setup: Optional[Callable[[], object]] = None) -> float:
+    """The best time of the function in seconds,
+    `setup` is called before each run without timing.
+    """
+    t = float('inf')
+    for _ in range(REPEAT):
+        if setup is not None:
+            setup()
+        t0 = perf_counter()
+        f()
+        t = min(t, perf_counter() - t0)
+    return t
+
+
+def main() -> None:
+    """Main function."""
+    p = make_parser()
+    # The rendered sections and the alias substitution are not reused
+    t = best(p.compile, lambda: clear(p))
+    print(f"{'compile':<20} {t * 1e3:>10.3f} ms")
+    for jobs in (1, 2, 4):
+        t = best(lambda: list(_compile_split_roots(['pkg'], [p], jobs)),
+                 lambda: clear(p))
+        print(f"{f'split (jobs={jobs})':<20} {t * 1e3:>10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the startup time of apimd.
+
+Each command runs in a new interpreter, the best wall time is reported
+with the interpreter startup itself as the baseline.
+
+Usage: python benchmarks/bench_startup.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from os import makedirs
+from os.path import join
+from sys import executable
+from subprocess import run, DEVNULL
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+REPEAT = 20
+
+
+def make_package(path: str, name: str, modules: int) -> None:
+    """Create a documented package with a function in each module."""
+    pkg = join(path, name)
+    makedirs(pkg)
+    for i in range(modules):
+        with open(join(pkg, f"m{i}.py" if i else "__init__.py"), 'w') as f:
+            f.write(f'"""Module {i}."""\n\n\n'
+                    f'def f{i}(x: int) -> int:\n'
+                    f'    """Function {i}."""\n'
+                    f'    return x\n')
+
+
+def best(*args: str) -> float:
+    """The best time of running the Python command in seconds."""
+    t = float('inf')
+    for _ in range(REPEAT):
+        t0 = perf_counter()
+        run([executable, *args], stdout=DEVNULL, stderr=DEVNULL, check=True)
+        t = min(t, perf_counter() - t0)
+    return t
+
+
+def main() -> None:
+    """Main function."""
+    with TemporaryDirectory() as path:
+        make_package(path, 'target', 5)
+        for title, args in [
+            ("interpreter", ('-c', 'pass')),
+            ("import apimd", ('-c', 'import apimd')),
+            ("import apimd.loader", ('-c', 'import apimd.loader')),
+            ("apimd --version", ('-m', 'apimd', '--version')),
+            ("apimd (5 modules)", ('-m', 'apimd', 'target', '-c', path,
+                                   '-d', join(path, 'docs'))),
+            ("apimd -q (5 modules)", ('-m', 'apimd', 'target', '-q',
+                                      '-c', path, '-d', join(path, 'docs'))),
+        ]:
+            print(f"{title:<22} {best(*args) * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
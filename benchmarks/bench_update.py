@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of incremental updating.
+
+Re-render the documentation after a single module is changed,
+the best time of several edits is reported.
+
+Usage: python benchmarks/bench_update.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from time import perf_counter
+from bench_alias import MODULE, make_parser
+
+REPEAT = 5
+
+
+def main() -> None:
+    """Main function."""
+    for modules in (500, 1000, 2000):
+        p = make_parser(modules)
+        t0 = perf_counter()
+        p.compile()
+        t1 = perf_counter()
+        t = float('inf')
+        for i in range(REPEAT):
+            t2 = perf_counter()
+            p.update('pkg.m0', MODULE.format(0).replace('func0', f'func{i}_'))
+            p.compile()
+            t = min(t, perf_counter() - t2)
+        print(f"{modules:>5} modules, {len(p.doc)} names: "
+              f"compile {(t1 - t0) * 1e3:.3f} ms, "
+              f"update and compile {t * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark of package discovery.
+
+The discovery time should not depend on the number of unrelated packages
+installed beside the target package.
+
+Usage: python benchmarks/bench_walk.py
+"""
+
+__author__ = "Yuan Chang"
+__copyright__ = "Copyright (C) 2020-2021"
+__license__ = "MIT"
+__email__ = "pyslvs@gmail.com"
+
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+from timeit import repeat
+from apimd.loader import walk_packages
+
+
+def make_package(path: str, name: str, modules: int) -> None:
+    """Create a package with empty modules."""
+    pkg = join(path, name)
+    makedirs(pkg)
+    for i in range(modules):
+        with open(join(pkg, f"m{i}.py" if i else "__init__.py"), 'w'):
+            pass
+
+
+def main() -> None:
+    """Main function."""
+    for unrelated in (0, 100, 1000):
+        with TemporaryDirectory() as path:
+            make_package(path, 'target', 20)
+            for i in range(unrelated):
+                make_package(path, f"unrelated{i}", 20)
+            t = min(repeat(lambda: list(walk_packages('target', path)),
+                           number=10, repeat=5)) / 10
+            print(f"{unrelated:>5} unrelated packages: {t * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()